@@ -0,0 +1,73 @@
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from parser import Element, HTMLParser  # noqa: E402
+from helpers import tree_to_list  # noqa: E402
+
+
+class DictText:
+    # The dict-backed layout Text had before it used __slots__
+    def __init__(self, text, parent):
+        self.text = text
+        self.children = []
+        self.parent = parent
+        self.style = {}
+        self.priority = 0
+
+
+class DictElement:
+    # The dict-backed layout Element had before it used __slots__
+    def __init__(self, tag, attributes, parent):
+        self.tag = tag
+        self.children = []
+        self.parent = parent
+        self.attributes = attributes
+        self.style = {}
+        self.priority = 0
+
+
+def large_document(paragraphs: int) -> str:
+    return "<html><body>" + "".join(
+        f"<div><p>Paragraph {i} with <b>bold</b> and <a href='/{i}'>a link</a>.</p>"
+        "<ul><li>one</li><li>two</li></ul></div>"
+        for i in range(paragraphs)
+    )
+
+
+def copy_as_dict_nodes(node, parent=None):
+    if isinstance(node, Element):
+        copy = DictElement(node.tag, dict(node.attributes), parent)
+        copy.children = [copy_as_dict_nodes(child, copy) for child in node.children]
+        return copy
+    return DictText(node.text, parent)
+
+
+def measure(build) -> int:
+    tracemalloc.start()
+    tree = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return size
+
+
+if __name__ == "__main__":
+    body = large_document(20000)
+    tree = HTMLParser(body).parse()
+    nodes = len(tree_to_list(tree, []))
+
+    slotted = measure(lambda: HTMLParser(body).parse())
+    # Text strings are shared with the existing tree, so both numbers count
+    # only the node objects and their containers
+    dict_backed = measure(lambda: copy_as_dict_nodes(tree))
+    text_bytes = sum(
+        sys.getsizeof(node.text)
+        for node in tree_to_list(tree, [])
+        if hasattr(node, "text")
+    )
+    print(f"nodes: {nodes}")
+    print(f"dict-backed: {dict_backed / nodes:.1f} bytes/node")
+    print(f"slotted:     {(slotted - text_bytes) / nodes:.1f} bytes/node")
@@ -0,0 +1,42 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from display_index import DisplayListIndex  # noqa: E402
+from draw import DrawRect, Rect  # noqa: E402
+
+PAGE_LENGTHS = [1000, 10000, 100000]
+VIEWPORT = 600
+
+
+def display_list(commands: int) -> list:
+    return [DrawRect(Rect(0, 20 * i, 100, 20 * i + 18), "red") for i in range(commands)]
+
+
+def linear_visible(commands: list, top: int, bottom: int) -> list:
+    return [
+        cmd for cmd in commands if not (cmd.rect.top > bottom or cmd.rect.bottom < top)
+    ]
+
+
+def time_scrolls(visible, page_height: int, steps: int = 200) -> float:
+    # Average time to find the visible commands at evenly spaced scroll
+    # positions from the top to the bottom of the page
+    start = time.perf_counter()
+    for step in range(steps):
+        scroll = page_height * step // steps
+        visible(scroll, scroll + VIEWPORT)
+    return (time.perf_counter() - start) / steps
+
+
+if __name__ == "__main__":
+    print(f"{'commands':>10} {'linear us':>10} {'indexed us':>11}")
+    for length in PAGE_LENGTHS:
+        commands = display_list(length)
+        index = DisplayListIndex(commands)
+        height = 20 * length
+        linear = time_scrolls(lambda t, b: linear_visible(commands, t, b), height)
+        indexed = time_scrolls(index.query, height)
+        print(f"{length:>10} {linear * 1e6:>10.1f} {indexed * 1e6:>11.1f}")
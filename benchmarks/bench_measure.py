@@ -0,0 +1,99 @@
+import _tkinter
+import os
+import random
+import sys
+import time
+import tkinter
+import tkinter.font
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from parser import HTMLParser  # noqa: E402
+import font_cache  # noqa: E402
+from css_parser import style  # noqa: E402
+from document_layout import DocumentLayout  # noqa: E402
+from font_cache import CachedFont, measure_stats, set_font_backend  # noqa: E402
+from font_metrics import FixedMetricsFontBackend  # noqa: E402
+
+
+class TclFont:
+    # Stand-in for tkinter.font.Font when there is no display: a plain Tcl
+    # interpreter whose font command returns the string length, so each
+    # measurement still costs a real Tcl round trip
+    tk = None
+    count = 0
+
+    def __init__(self, **options):
+        if TclFont.tk is None:
+            TclFont.tk = _tkinter.create(None, "", "Tcl", False, True, False, False)
+            TclFont.tk.eval("proc font {command name text} { string length $text }")
+        TclFont.count += 1
+        self._tk = TclFont.tk
+        self.name = f"font{TclFont.count}"
+        self.size = options.get("size", 12)
+
+    def measure(self, text):
+        return self._tk.getint(self._tk.call("font", "measure", self.name, text))
+
+    def metrics(self, name=None):
+        metrics = {
+            "ascent": self.size,
+            "descent": self.size // 4,
+            "linespace": self.size + self.size // 4,
+            "fixed": 0,
+        }
+        return metrics[name] if name else metrics
+
+
+def use_available_fonts() -> str:
+    try:
+        tkinter.Tk().withdraw()
+        return "Tk"
+    except tkinter.TclError:
+        tkinter.font.Font = TclFont
+        tkinter.Label = lambda font: None
+        return "Tcl stand-in (no display)"
+
+
+def text_page(paragraphs: int, vocabulary: int) -> str:
+    rng = random.Random(0)
+    words = [f"word{i}" for i in range(vocabulary)]
+    body = []
+    for _ in range(paragraphs):
+        sentence = [rng.choice(words) for _ in range(80)]
+        sentence[10] = f"<b>{sentence[10]}</b>"
+        sentence[40] = f"<i>{sentence[40]}</i>"
+        body.append("<p>" + " ".join(sentence) + "</p>")
+    return "<html><body>" + "".join(body) + "</body></html>"
+
+
+def first_layout(tree) -> tuple[float, dict]:
+    # Each run starts with empty caches, as a freshly loaded page would
+    font_cache.FONTS.clear()
+    start = time.perf_counter()
+    DocumentLayout(tree).layout()
+    return time.perf_counter() - start, measure_stats()
+
+
+if __name__ == "__main__":
+    print(f"fonts: {use_available_fonts()}")
+    tree = HTMLParser(text_page(500, 5000)).parse()
+    style(tree, [])
+
+    batched_time, batched = min(
+        (first_layout(tree) for _ in range(3)), key=lambda run: run[0]
+    )
+    measure_many = CachedFont.measure_many
+    CachedFont.measure_many = lambda self, texts: None  # type: ignore
+    unbatched_time, unbatched = min(
+        (first_layout(tree) for _ in range(3)), key=lambda run: run[0]
+    )
+    CachedFont.measure_many = measure_many  # type: ignore
+
+    set_font_backend(FixedMetricsFontBackend())
+    fixed_time, _ = min((first_layout(tree) for _ in range(3)), key=lambda run: run[0])
+
+    print(f"{'':>13} {'tk calls':>10} {'seconds':>10}")
+    print(f"{'per word':>13} {unbatched['tk_calls']:>10} {unbatched_time:>10.3f}")
+    print(f"{'batched':>13} {batched['tk_calls']:>10} {batched_time:>10.3f}")
+    print(f"{'fixed metrics':>13} {0:>10} {fixed_time:>10.3f}")
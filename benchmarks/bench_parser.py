@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from parser import HTMLParser  # noqa: E402
+
+DEPTHS = [1000, 2000, 4000, 8000, 16000]
+# div, two p, ul and two li
+ELEMENTS_PER_LEVEL = 6
+
+
+def nested_document(depth: int) -> str:
+    # Every level leaves a <p> and an <li> unclosed before opening a sibling
+    # of the same tag, so the implicit-close path for <p>/<li> runs at every
+    # depth of the stack, not just once at the bottom
+    opening = "".join(
+        f"<div class='level{i}'><p>text {i}<p>more {i}</p>"
+        f"<ul><li>item {i}<li>item {i}</li></ul>"
+        for i in range(depth)
+    )
+    return "<html><body>" + opening + "<p>deepest</p>" + "</div>" * depth
+
+
+def time_parse(body: str) -> float:
+    start = time.perf_counter()
+    HTMLParser(body).parse()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    print(f"{'depth':>8} {'seconds':>10} {'us/element':>12}")
+    for depth in DEPTHS:
+        elapsed = min(time_parse(nested_document(depth)) for _ in range(3))
+        print(
+            f"{depth:>8} {elapsed:>10.4f} {elapsed / (ELEMENTS_PER_LEVEL * depth) * 1e6:>12.2f}"
+        )
@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from parser import HTMLParser  # noqa: E402
+from constants import INHERTIED_PROPERTIES  # noqa: E402
+from css_parser import (  # noqa: E402
+    CSSParser,
+    DescendantSelector,
+    RuleIndex,
+    StyleSharingCache,
+    restyle,
+    style,
+)
+from helpers import cascade_priority, tree_to_list  # noqa: E402
+
+TAGS = ["div", "p", "span", "a", "li", "ul", "section", "b", "i", "em"]
+
+
+def large_page(sections: int) -> str:
+    return "<html><body>" + "".join(
+        f"<section class='s{i % 50}'><div class='box{i % 200}'>"
+        f"<p>Text <b>bold</b> <a class='link{i % 100}' href='/{i}'>link</a></p>"
+        "<ul><li>one</li><li class='item'>two</li></ul></div></section>"
+        for i in range(sections)
+    )
+
+
+def large_stylesheet(rules: int) -> str:
+    sheet = []
+    for i in range(rules):
+        kind = i % 3
+        if kind == 0:
+            sheet.append(f".box{i} {{ color: red; }}")
+        elif kind == 1:
+            sheet.append(f"{TAGS[i % len(TAGS)]}.c{i} {{ font-weight: bold; }}")
+        else:
+            sheet.append(f"section .link{i} {{ font-style: italic; }}")
+    return "\n".join(sheet)
+
+
+def linear_style(node, rules):
+    # Reference implementation: every rule tested against every node
+    node.style = {
+        prop: node.parent.style[prop] if node.parent else default
+        for prop, default in INHERTIED_PROPERTIES.items()
+    }
+    for selector, body in rules:
+        if selector.matches(node):
+            node.style.update(body)
+    for child in node.children:
+        linear_style(child, rules)
+
+
+def best_of(runs: int, fn) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    tree = HTMLParser(large_page(1000)).parse()
+    rules = sorted(CSSParser(large_stylesheet(3000)).parse(), key=cascade_priority)
+    print(f"nodes: {len(tree_to_list(tree, []))}, rules: {len(rules)}")
+    print(f"linear:  {best_of(3, lambda: linear_style(tree, rules)):.3f}s")
+    print(f"indexed: {best_of(3, lambda: style(tree, rules)):.3f}s")
+    index = RuleIndex(rules)
+    section = tree.children[0].children[500]
+
+    def change_one_class():
+        section.set_attribute("class", "changed")
+        restyle(tree, index)
+
+    print(f"restyle after one class change: {best_of(3, change_one_class):.5f}s")
+    shared = StyleSharingCache()
+    style(tree, rules, shared=shared)
+    stats = shared.stats()
+    print(
+        f"style sharing: {stats['styles']} distinct styles, "
+        f"{stats['hits']} hits, {stats['misses']} misses"
+    )
+    descendant_rules = sorted(
+        CSSParser(
+            "\n".join(
+                f"{ancestor} {tag} {{ color: blue; }}"
+                for ancestor in ["article", "nav", "table", "section", "ul"]
+                for tag in TAGS
+            )
+        ).parse(),
+        key=cascade_priority,
+    )
+    DescendantSelector.reset_stats()
+    style(tree, descendant_rules)
+    print(
+        f"descendant selectors: {DescendantSelector.fast_rejects} fast rejects, "
+        f"{DescendantSelector.full_walks} full walks"
+    )
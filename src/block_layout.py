@@ -1,19 +1,18 @@
-import tkinter
 from parser import Element, Text
 from typing import Literal
 
 from constants import (
     BLOCK_ELEMENTS,
     BLOCK_LAYOUT,
-    ENTITY_MAP,
     HSTEP,
     INLINE_LAYOUT,
     INPUT_WIDTH_PX,
     SCROLLBAR_WIDTH,
+    SOFT_HYPHEN,
     Style,
 )
 from draw import DrawRect, DrawText, Rect
-from font_cache import get_font
+from font_cache import CachedFont, get_font
 from input_layout import InputLayout
 from line_layout import LineLayout, TextLayout
 from typedclasses import DisplayListItem, LineItem
@@ -41,32 +40,25 @@ class BlockLayout:
         self.display_list: list[DisplayListItem | DrawText | DrawRect] = []
         self.x: int = 0
         self.y: int = 0
+        self.laid_out: bool = False
 
-    def _handle_soft_hyphen(
-        self, word: str, font: tkinter.font.Font, node, color
-    ) -> None:
+    def _handle_soft_hyphen(self, word: str, font: CachedFont, node, color) -> None:
         # If word has a soft hyphen, append string before hyphen to the current
         # line, start a new line, and call .word on the rest of the word
-        split_text = word.split("&shy;", 1)
+        split_text = word.split(SOFT_HYPHEN, 1)
         self.line.append(
             LineItem(x=self.cursor_x, text=split_text[0] + "-", font=font, color=color)
         )
         self.new_line()
         self.word(split_text[1], node)
 
-    def replace_entities(self, word: str) -> str:
-        for entity in ENTITY_MAP:
-            if entity in word:
-                word = word.replace(entity, ENTITY_MAP[entity])
-        return word
-
     def new_line(self):
         self.cursor_x = 0
         last_line = self.children[-1] if self.children else None
         new_line = LineLayout(self.node, self, last_line)
         self.children.append(new_line)
 
-    def word(self, word: str, node: Element | Text) -> None:
+    def font_for(self, node: Element | Text) -> CachedFont:
         weight: Literal["bold", "normal"] = node.style.get("font-weight", "normal")
         style: Literal["roman", "italic"] = node.style.get("font-style", "roman")
         family: str = node.style.get("font-family")
@@ -76,19 +68,40 @@ class BlockLayout:
             style = Style.ROMAN.value
         size: int = int(float(node.style.get("font-size", "10px")[:-2]) * 0.75)
 
-        font = get_font(size, weight, style, family)
+        return get_font(size, weight, style, family)
+
+    def measure_words(self, node: Element | Text) -> None:
+        # Measure every distinct word in this inline context up front, one
+        # batch per font, so line breaking only reads cached widths
+        batches: dict[CachedFont, set[str]] = {}
+        stack: list[Element | Text] = [node]
+        while stack:
+            current = stack.pop()
+            if isinstance(current, Text):
+                font = self.font_for(current)
+                batch = batches.setdefault(font, {" "})
+                if current.parent.tag == "abbr":
+                    batch.update(word.upper() for word in current.text.split())
+                else:
+                    batch.update(current.text.split())
+            elif current.tag != "input" and current.tag != "button":
+                stack.extend(current.children)
+        for font, batch in batches.items():
+            font.measure_many(batch)
+
+    def word(self, word: str, node: Element | Text) -> None:
+        font = self.font_for(node)
         is_abbr = isinstance(node, Text) and node.parent.tag == "abbr"
         if is_abbr:
             word = word.replace(word, word.upper())
         w = font.measure(word)
         if self.cursor_x + w > self.width - HSTEP - SCROLLBAR_WIDTH:
             self.new_line()
-            # if "&shy;" in word:
+            # if SOFT_HYPHEN in word:
             # return self._handle_soft_hyphen(word, font, node, color)
-        # elif "&shy;" in word:
-        # word = word.replace("&shy;", "")
+        # elif SOFT_HYPHEN in word:
+        # word = word.replace(SOFT_HYPHEN, "")
 
-        word = self.replace_entities(word)
         line = self.children[-1]
         previous_word = line.children[-1] if line.children else None
         text = TextLayout(node, word, line, previous_word)
@@ -142,25 +155,61 @@ class BlockLayout:
             return BLOCK_LAYOUT
 
     def _layout_block_mode(self) -> None:
+        # Keep the blocks of child nodes that were laid out before; each one
+        # decides for itself whether it has to be laid out again
+        existing = {
+            child.node: child
+            for child in self.children
+            if isinstance(child, BlockLayout)
+        }
+        self.children = []
         previous = None
         for child in self.node.children:
             if isinstance(child, Element) and child.tag == "head":
                 continue
-            next = BlockLayout(child, self, previous)
+            next = existing.get(child)
+            if next is None:
+                next = BlockLayout(child, self, previous)
+            else:
+                next.previous = previous
             self.children.append(next)
             previous = next
 
     def _layout_inline_mode(self) -> None:
+        self.children = []
+        self.measure_words(self.node)
         self.new_line()
         self.recurse(self.node)
 
+    def shift(self, dy: int) -> None:
+        # Moves this block and everything in it without laying it out again
+        stack: list = [self]
+        while stack:
+            layout_object = stack.pop()
+            layout_object.y += dy
+            stack.extend(layout_object.children)
+
     def layout(self) -> None:
-        self.x = self.parent.x
-        self.width = self.parent.width
+        x = self.parent.x
+        width = self.parent.width
         if self.previous:
-            self.y = self.previous.y + self.previous.height
+            y = self.previous.y + self.previous.height
         else:
-            self.y = self.parent.y
+            y = self.parent.y
+
+        if (
+            self.laid_out
+            and not self.node.layout_dirty
+            and x == self.x
+            and width == self.width
+        ):
+            if y != self.y:
+                self.shift(y - self.y)
+            return
+
+        self.x = x
+        self.width = width
+        self.y = y
 
         mode = self.layout_mode()
         if mode == BLOCK_LAYOUT:
@@ -172,6 +221,8 @@ class BlockLayout:
             block_child.layout()
 
         self.height = sum([child.height for child in self.children])
+        self.laid_out = True
+        clear_layout_dirty(self.node)
 
     def paint(self) -> list[DrawRect]:
         cmds: list[DrawRect] = []
@@ -199,3 +250,12 @@ class BlockLayout:
         return isinstance(self.node, Text) or (
             self.node.tag != "input" and self.node.tag != "button"
         )
+
+
+def clear_layout_dirty(node: Element | Text) -> None:
+    # Clean nodes only have clean descendants, so this stops at them
+    if not node.layout_dirty:
+        return
+    node.layout_dirty = False
+    for child in node.children:
+        clear_layout_dirty(child)
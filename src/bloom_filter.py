@@ -0,0 +1,28 @@
+from constants import BLOOM_FILTER_SIZE
+
+
+class CountingBloomFilter:
+    # A Bloom filter whose slots are counters rather than bits, so keys can
+    # be removed again when the style pass leaves an element's subtree.
+    # Lookups can return false positives but never false negatives.
+    def __init__(self, size: int = BLOOM_FILTER_SIZE) -> None:
+        self.size: int = size
+        self.counts: list[int] = [0] * size
+
+    def _slots(self, key) -> tuple[int, int]:
+        h = hash(key)
+        return h % self.size, (h >> 16) % self.size
+
+    def add(self, key) -> None:
+        first, second = self._slots(key)
+        self.counts[first] += 1
+        self.counts[second] += 1
+
+    def remove(self, key) -> None:
+        first, second = self._slots(key)
+        self.counts[first] -= 1
+        self.counts[second] -= 1
+
+    def might_contain(self, key) -> bool:
+        first, second = self._slots(key)
+        return self.counts[first] > 0 and self.counts[second] > 0
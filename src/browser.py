@@ -1,12 +1,18 @@
 import argparse
+import os
+import sys
 import tkinter
 import tkinter.font
 from typing import Optional
 
+from canvas_layer import CanvasLayer
 from chrome import Chrome
 from constants import HEIGHT, TEST_FILE, WIDTH
-from document_layout import DocumentLayout
-from helpers import paint_tree
+from draw import Rect
+from headless import OUTPUT_FORMATS, render_pages
+from http_cache import HTTP_CACHE
+from network_loader import NetworkLoader
+from stylesheet_cache import STYLESHEET_CACHE
 from tab import Tab
 from url import URL
 
@@ -18,8 +24,13 @@ class Browser:
         self.window = tkinter.Tk()
         self.canvas = tkinter.Canvas(self.window, width=WIDTH, height=HEIGHT)
         self.canvas.pack(fill="both", expand=1)
+        self.content_layer = CanvasLayer(self.canvas, "content")
+        self.chrome_layer = CanvasLayer(self.canvas, "chrome")
+        self.loader = NetworkLoader(self.window)
         self.screen_width = WIDTH
         self.chrome = Chrome(self)
+        # Window areas whose commands need repainting on the next draw
+        self.damage: list[Rect] = []
         self.window.bind("<Down>", self.handle_down)
         self.window.bind("<Up>", self.handle_up)
         self.window.bind("<Configure>", self.handle_resize)
@@ -30,18 +41,13 @@ class Browser:
 
     def handle_enter(self, e):
         self.chrome.enter()
+        self.invalidate()
         self.draw()
 
     def handle_resize(self, e):
         self.chrome.browser_width = e.width
-        self.active_tab.screen_width = e.width
-        self.active_tab.document = DocumentLayout(
-            node=self.active_tab.nodes, width=e.width, height=e.height
-        )
-        self.active_tab.document.layout()
-        self.active_tab.tab_height = e.height
-        self.active_tab.display_list = []
-        paint_tree(self.active_tab.document, self.active_tab.display_list)
+        self.active_tab.resize(e.width, e.height)
+        self.invalidate()
         self.draw()
 
     def handle_backspace(self, e):
@@ -58,10 +64,12 @@ class Browser:
 
     def handle_up(self, e):
         self.active_tab.scrollup()
+        self.invalidate(self.content_bounds())
         self.draw()
 
     def handle_down(self, e):
         self.active_tab.scrolldown()
+        self.invalidate(self.content_bounds())
         self.draw()
 
     def handle_click(self, e):
@@ -71,31 +79,85 @@ class Browser:
             # Subtract chrome size when clicking tab contents
             tab_y = e.y - self.chrome.bottom
             self.active_tab.click(e.x, tab_y)
+        self.invalidate()
         self.draw()
 
+    def content_bounds(self) -> Rect:
+        assert self.active_tab
+        top = self.chrome.bottom
+        return Rect(0, top, self.chrome.browser_width, top + self.active_tab.tab_height)
+
+    def invalidate(self, rect: Optional[Rect] = None) -> None:
+        # Without a rect the whole window is damaged
+        if rect is None:
+            rect = Rect(0, 0, self.chrome.browser_width, self.content_bounds().bottom)
+        self.damage.append(rect)
+
     def draw(self):
-        self.canvas.delete("all")
-        self.active_tab.draw(self.canvas, self.chrome.bottom)
-        for cmd in self.chrome.paint():
-            cmd.execute(0, self.canvas)
+        damage, self.damage = self.damage, []
+        restacked = False
+        if any(rect.intersects(self.content_bounds()) for rect in damage):
+            restacked = self.active_tab.draw(self.content_layer, self.chrome.bottom)
+        if any(rect.intersects(self.chrome.bounds()) for rect in damage):
+            chrome_cmds = self.chrome.paint(damage)
+            restacked = self.chrome_layer.update(chrome_cmds, 0) or restacked
+        if restacked:
+            # Page items must stay under the scrollbar and the chrome
+            self.canvas.tag_raise("scrollbar")
+            self.canvas.tag_raise("chrome")
 
     def new_tab(self, url):
-        new_tab = Tab(HEIGHT - self.chrome.bottom)
-        new_tab.load(url)
+        new_tab = Tab(
+            HEIGHT - self.chrome.bottom, loader=self.loader, on_load=self.tab_loaded
+        )
         self.active_tab = new_tab
         self.tabs.append(new_tab)
+        new_tab.load(url)
+        self.invalidate()
         self.draw()
 
+    def tab_loaded(self, tab: Tab):
+        if tab == self.active_tab:
+            self.invalidate()
+            self.draw()
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "url",
         metavar="URL",
-        default=f"file://{TEST_FILE}",
-        help="URL to serve",
-        nargs="?",
+        default=[f"file://{TEST_FILE}"],
+        help="URL to serve; several can be given with --headless",
+        nargs="*",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default="",
+        help="Directory to keep an on-disk HTTP cache in; without it responses "
+        "are only cached in memory",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Render each URL to --out without opening a window",
+    )
+    parser.add_argument(
+        "--out",
+        default="page.json",
+        help="Output file for --headless, ending in .json (display list) or .svg; "
+        "with several URLs, each page's number is added before the extension",
+    )
+    parser.add_argument(
+        "--width", type=int, default=WIDTH, help="Page width for --headless"
     )
     args = parser.parse_args()
-    Browser().new_tab(URL(args.url))
+    if args.headless and os.path.splitext(args.out)[1].lower() not in OUTPUT_FORMATS:
+        parser.error(f"--out must end in one of {', '.join(OUTPUT_FORMATS)}")
+    HTTP_CACHE.directory = os.path.expanduser(args.cache_dir) or None
+    # Parse the default sheet before the first page starts loading
+    STYLESHEET_CACHE.default_style_sheet()
+    if args.headless:
+        sys.exit(render_pages(args.url, args.out, args.width))
+    Browser().new_tab(URL(args.url[0]))
     tkinter.mainloop()
@@ -0,0 +1,94 @@
+import tkinter
+
+
+class CanvasLayer:
+    # Keeps the canvas items drawn for one group of draw commands (the page,
+    # or the browser chrome) between frames. Each frame is diffed against
+    # the previous one by command key, so only commands that appeared are
+    # created, only those that went away are deleted, and the rest stay put.
+    def __init__(self, canvas: tkinter.Canvas, tag: str) -> None:
+        self.canvas = canvas
+        # Every item in the layer carries this tag, so the layer can be
+        # raised or scrolled as a whole
+        self.tag: str = tag
+        # Scroll offset all items in the layer are currently drawn at
+        self.scroll: float = 0
+        # Command key -> item ids, one per copy of the command on the canvas
+        self.items: dict[tuple, list[int]] = {}
+        # Keys of the last frame's commands, so unchanged commands aren't
+        # re-keyed on every scroll step
+        self.keys: dict[object, tuple] = {}
+        # Item ids in paint order, bottom first
+        self.order: list[int] = []
+        self.created: int = 0
+        self.deleted: int = 0
+        self.moved: int = 0
+
+    def update(self, commands: list, scroll: float) -> bool:
+        # Draws commands at scroll; returns whether items were restacked,
+        # in which case layers above this one need raising again
+        if scroll != self.scroll and self.order:
+            # Translate everything already drawn in one Tk call; only the
+            # band of commands scrolled into view is created below
+            self.canvas.move(self.tag, 0, self.scroll - scroll)
+            self.moved += 1
+        self.scroll = scroll
+        previous = self.items
+        previous_keys = self.keys
+        previous_rank = {item: i for i, item in enumerate(self.order)}
+        items: dict[tuple, list[int]] = {}
+        keys: dict[object, tuple] = {}
+        order: list[int] = []
+        new_items: set[int] = set()
+        for cmd in commands:
+            key = previous_keys.get(cmd) or cmd.key()
+            keys[cmd] = key
+            copies = previous.get(key)
+            if copies:
+                item = copies.pop()
+            else:
+                item = cmd.execute(scroll, self.canvas, (self.tag,))
+                new_items.add(item)
+                self.created += 1
+            items.setdefault(key, []).append(item)
+            order.append(item)
+        stale = [item for copies in previous.values() for item in copies]
+        if stale:
+            self.canvas.delete(*stale)
+            self.deleted += len(stale)
+        self.items = items
+        self.keys = keys
+        self.order = order
+        return self._restack(new_items, previous_rank)
+
+    def _restack(self, new_items: set[int], previous_rank: dict[int, int]) -> bool:
+        kept = [previous_rank[item] for item in self.order if item not in new_items]
+        if any(a > b for a, b in zip(kept, kept[1:])):
+            # Kept items changed order; rebuild the whole layer's stacking
+            for item in self.order:
+                self.canvas.tag_raise(item)
+            return True
+        if not new_items:
+            return False
+        # New items are created on top of everything; slot each one in just
+        # above the item painted before it
+        for below, item in zip(self.order, self.order[1:]):
+            if item in new_items:
+                self.canvas.tag_raise(item, below)
+        if self.order[0] in new_items and len(self.order) > 1:
+            self.canvas.tag_lower(self.order[0], self.order[1])
+        return True
+
+    def clear(self) -> None:
+        self.canvas.delete(self.tag)
+        self.items = {}
+        self.keys = {}
+        self.order = []
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "items": len(self.order),
+            "created": self.created,
+            "deleted": self.deleted,
+            "moved": self.moved,
+        }
@@ -1,7 +1,7 @@
-import tkinter.font
+from typing import Callable, Optional
 
 from draw import Rect, DrawLine, DrawOutline, DrawRect, DrawText
-from font_cache import get_font
+from font_cache import CachedFont, get_font
 from url import URL
 
 
@@ -9,7 +9,7 @@ class Chrome:
     def __init__(self, browser):
         self.browser = browser
         self.browser_width = self.browser.screen_width
-        self.font: tkinter.font.Font = get_font(20, "normal", "roman")
+        self.font: CachedFont = get_font(20, "normal", "roman")
         self.font_height: int = self.font.metrics("linespace")
         self.padding: int = 5
         self.tabbar_top = 0
@@ -41,6 +41,8 @@ class Chrome:
         )
         self.focus = None
         self.address_bar = ""
+        # Commands each component painted last time, by component index
+        self.painted: dict[int, list] = {}
 
     def click(self, x: int, y: int):
         self.focus = None
@@ -60,10 +62,12 @@ class Chrome:
     def keypress(self, char: str):
         if self.focus == "address bar":
             self.address_bar += char
+            self.browser.invalidate(self.address_rect)
 
     def backspace(self):
         if self.focus == "address bar":
             self.address_bar = self.address_bar[:-1]
+            self.browser.invalidate(self.address_rect)
 
     def enter(self):
         if self.focus == "address bar":
@@ -80,11 +84,13 @@ class Chrome:
             self.tabbar_bottom,
         )
 
-    def _paint_new_tab_button(self, cmds):
+    def _paint_background(self, cmds):
         cmds.append(DrawRect(Rect(0, 0, self.browser_width, self.bottom), "white"))
         cmds.append(
             DrawLine(0, self.bottom, self.browser_width, self.bottom, "black", 1)
         )
+
+    def _paint_new_tab_button(self, cmds):
         cmds.append(DrawOutline(self.newtab_rect, "black", 1))
         cmds.append(
             DrawText(
@@ -176,11 +182,46 @@ class Chrome:
             )
         )
 
-    def paint(self) -> list:
-        cmds = []
-        self._paint_new_tab_button(cmds)
-        self._paint_tabs(cmds)
-        self._paint_address_bar(cmds)
-        self._paint_back_button(cmds)
+    def _paint_loading_indicator(self, cmds):
+        if not self.browser.active_tab.loading:
+            return
+        text = "Loading..."
+        cmds.append(
+            DrawText(
+                self.browser_width - self.padding - self.font.measure(text),
+                self.tabbar_top + self.padding,
+                text,
+                self.font,
+                "gray",
+            )
+        )
 
+    def bounds(self) -> Rect:
+        return Rect(0, 0, self.browser_width, self.bottom)
+
+    def components(self) -> list[tuple[Rect, Callable[[list], None]]]:
+        # Each component's paint method with the area its commands stay inside
+        tabbar = Rect(0, self.tabbar_top, self.browser_width, self.tabbar_bottom)
+        return [
+            (self.bounds(), self._paint_background),
+            (self.newtab_rect, self._paint_new_tab_button),
+            (tabbar, self._paint_tabs),
+            (self.address_rect, self._paint_address_bar),
+            (self.back_rect, self._paint_back_button),
+            (tabbar, self._paint_loading_indicator),
+        ]
+
+    def paint(self, damage: Optional[list[Rect]] = None) -> list:
+        # Repaints only the components intersecting damage (all of them when
+        # it is None) and reuses the others' commands from the last paint
+        cmds = []
+        for i, (bounds, paint) in enumerate(self.components()):
+            if (
+                damage is None
+                or i not in self.painted
+                or any(bounds.intersects(rect) for rect in damage)
+            ):
+                self.painted[i] = []
+                paint(self.painted[i])
+            cmds.extend(self.painted[i])
         return cmds
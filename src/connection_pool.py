@@ -0,0 +1,80 @@
+import socket
+import ssl
+import threading
+import time
+from typing import Optional
+
+from constants import IDLE_CONNECTION_TIMEOUT, MAX_IDLE_CONNECTIONS
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        max_idle: int = MAX_IDLE_CONNECTIONS,
+        idle_timeout: float = IDLE_CONNECTION_TIMEOUT,
+    ) -> None:
+        self.max_idle: int = max_idle
+        self.idle_timeout: float = idle_timeout
+        # Idle connections as (key, socket, released_at), least recently
+        # released first so eviction pops from the front
+        self.idle: list[tuple[tuple, socket.socket, float]] = []
+        self.hits: int = 0
+        self.misses: int = 0
+        self.lock = threading.Lock()
+
+    def connect(
+        self, scheme: str, host: str, port: int, timeout: Optional[float] = None
+    ) -> socket.socket:
+        s = (
+            socket.socket()
+        )  # defaults: addr family AF_INET, type SOCKET_STREAM, protocol IPPROTO_TCP
+        s.settimeout(timeout)
+        s.connect((host, port))
+
+        if scheme == "https":
+            ctx = ssl.create_default_context()
+            s = ctx.wrap_socket(s, server_hostname=host)
+        return s
+
+    def acquire(
+        self, scheme: str, host: str, port: int, timeout: Optional[float] = None
+    ) -> tuple[socket.socket, bool]:
+        # Returns a connection to (scheme, host, port) and whether it was reused
+        key = (scheme, host, port)
+        with self.lock:
+            self._evict_expired()
+            for i in range(len(self.idle) - 1, -1, -1):
+                if self.idle[i][0] == key:
+                    _, s, _ = self.idle.pop(i)
+                    self.hits += 1
+                    s.settimeout(timeout)
+                    return s, True
+            self.misses += 1
+        return self.connect(scheme, host, port, timeout), False
+
+    def release(self, scheme: str, host: str, port: int, s: socket.socket) -> None:
+        with self.lock:
+            self.idle.append(((scheme, host, port), s, time.monotonic()))
+            while len(self.idle) > self.max_idle:
+                _, evicted, _ = self.idle.pop(0)
+                evicted.close()
+
+    def _evict_expired(self) -> None:
+        deadline = time.monotonic() - self.idle_timeout
+        while self.idle and self.idle[0][2] < deadline:
+            _, expired, _ = self.idle.pop(0)
+            expired.close()
+
+    def clear(self) -> None:
+        with self.lock:
+            for _, s, _ in self.idle:
+                s.close()
+            self.idle = []
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "idle": len(self.idle)}
+
+
+CONNECTION_POOL = ConnectionPool()
@@ -12,6 +12,19 @@ INPUT_WIDTH_PX = 200
 TEST_FILE = "/Users/margotkriete/Desktop/test.html"
 PORTS = {"http": 80, "https": 443}
 
+# Networking
+MAX_IDLE_CONNECTIONS = 8
+IDLE_CONNECTION_TIMEOUT = 30  # seconds
+NO_BODY_STATUSES = [204, 304]
+DEFAULT_CHARSET = "utf-8"
+STREAM_BLOCK_SIZE = 64 * 1024
+MAX_SUBRESOURCE_FETCHES = 6
+SUBRESOURCE_TIMEOUT = 10  # seconds
+MAX_PAGE_LOADS = 4
+PAGE_LOAD_TIMEOUT = 30  # seconds
+LOAD_POLL_MS = 16
+HTTP_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
 # HTML parsing
 SELF_CLOSING_TAGS = [
     "area",
@@ -50,9 +63,24 @@ CLOSING_HTML_TAG = "/html"
 CLOSING_HEAD_TAG = "/head"
 SIBLING_TAGS = ["p", "li"]
 
+# Parser insertion modes, named after the HTML spec's
+INITIAL_MODE = "initial"
+BEFORE_HEAD_MODE = "before head"
+IN_HEAD_MODE = "in head"
+IN_BODY_MODE = "in body"
+
 # Layout
 INLINE_LAYOUT = "inline"
 BLOCK_LAYOUT = "block"
+# Entities are decoded by the parser, so layout sees the character itself
+SOFT_HYPHEN = "\N{SOFT HYPHEN}"
+# Widths remembered per font before the least recently used are dropped
+MEASURE_CACHE_SIZE = 4096
+# Height of the bands the display list is indexed in for drawing
+DISPLAY_TILE_HEIGHT = 256
+# Used by the fixed-metrics font backend, which has no display to ask
+POINTS_TO_PIXELS = 96 / 72
+MONOSPACE_FAMILIES = ["Courier", "Courier New", "monospace"]
 BLOCK_ELEMENTS = [
     "html",
     "body",
@@ -108,6 +136,8 @@ class Weight(Enum):
 
 
 # CSS parsing
+BLOOM_FILTER_SIZE = 4096
+STYLESHEET_CACHE_MAX_BYTES = 4 * 1024 * 1024
 INHERTIED_PROPERTIES = {
     "font-size": "16px",
     "font-style": "normal",
@@ -115,11 +145,3 @@ INHERTIED_PROPERTIES = {
     "color": "black",
     "font-family": "Courier New",
 }
-
-ENTITY_MAP = {
-    "&quot;": '"',
-    "&apos;": "'",
-    "&ndash;": "-",
-    "&hyphen;": "-",
-    "&amp;": "&",
-}
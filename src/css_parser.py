@@ -1,6 +1,9 @@
-from parser import Element, Text
-from typing import Optional, Tuple
+import heapq
+from parser import EMPTY_STYLE, Element, Text
+from types import MappingProxyType
+from typing import Any, Iterable, Mapping, Optional, Tuple
 
+from bloom_filter import CountingBloomFilter
 from constants import INHERTIED_PROPERTIES
 
 
@@ -8,18 +11,33 @@ class Selector:
     def __init__(self):
         self.priority = 1
 
-    def matches(self, node):
+    def matches(self, node, ancestors: Optional[CountingBloomFilter] = None):
         pass
 
+    def index_key(self) -> Optional[Tuple[str, str]]:
+        # The bucket a RuleIndex files this selector under; None means the
+        # selector has to be tried against every node
+        return None
+
+    def ancestor_keys(self) -> list[Tuple[str, str]]:
+        # Keys an element must carry for this selector to match it
+        return []
+
 
 class TagSelector(Selector):
     def __init__(self, tag: str):
         self.tag: str = tag
         self.priority: int = 1
 
-    def matches(self, node) -> bool:
+    def matches(self, node, ancestors: Optional[CountingBloomFilter] = None) -> bool:
         return isinstance(node, Element) and self.tag == node.tag
 
+    def index_key(self) -> Optional[Tuple[str, str]]:
+        return ("tag", self.tag)
+
+    def ancestor_keys(self) -> list[Tuple[str, str]]:
+        return [("tag", self.tag)]
+
 
 class ClassSelector(Selector):
     def __init__(self, cls: str, tag: Optional[str] = None):
@@ -27,7 +45,7 @@ class ClassSelector(Selector):
         self.priority: int = 0
         self.tag: Optional[str] = tag
 
-    def matches(self, node) -> bool:
+    def matches(self, node, ancestors: Optional[CountingBloomFilter] = None) -> bool:
         tag_matches = (
             self.tag is not None and isinstance(node, Element) and node.tag == self.tag
         ) or not self.tag
@@ -38,22 +56,56 @@ class ClassSelector(Selector):
             and tag_matches
         )
 
+    def index_key(self) -> Optional[Tuple[str, str]]:
+        return ("class", self.cls)
+
+    def ancestor_keys(self) -> list[Tuple[str, str]]:
+        keys = [("class", self.cls)]
+        if self.tag:
+            keys.append(("tag", self.tag))
+        return keys
+
 
 class DescendantSelector(Selector):
+    # How often the ancestor filter ruled a match out without walking up
+    # the tree, versus how often the parent chain had to be walked
+    fast_rejects: int = 0
+    full_walks: int = 0
+
     def __init__(self, ancestor: Selector, descendant: Selector):
         self.ancestor = ancestor
         self.descendant = descendant
         self.priority: int = ancestor.priority + descendant.priority
+        self.required_ancestor_keys = ancestor.ancestor_keys()
 
-    def matches(self, node: Element | Text) -> bool:
+    def matches(
+        self, node: Element | Text, ancestors: Optional[CountingBloomFilter] = None
+    ) -> bool:
         if not self.descendant.matches(node):
             return False
+        if ancestors is not None and not all(
+            ancestors.might_contain(key) for key in self.required_ancestor_keys
+        ):
+            DescendantSelector.fast_rejects += 1
+            return False
+        DescendantSelector.full_walks += 1
         while node.parent:
             if self.ancestor.matches(node.parent):
                 return True
             node = node.parent
         return False
 
+    def index_key(self) -> Optional[Tuple[str, str]]:
+        return self.descendant.index_key()
+
+    def ancestor_keys(self) -> list[Tuple[str, str]]:
+        return self.ancestor.ancestor_keys() + self.descendant.ancestor_keys()
+
+    @classmethod
+    def reset_stats(cls) -> None:
+        cls.fast_rejects = 0
+        cls.full_walks = 0
+
 
 class CSSParser:
     def __init__(self, s: str) -> None:
@@ -151,37 +203,216 @@ class CSSParser:
         return rules
 
 
-def style(node: Element | Text, rules: list[Tuple[Selector, dict]]):
-    node.style = {}
+class RuleIndex:
+    # Buckets rules by the tag or class their rightmost selector needs, so
+    # each node is only tested against rules that could possibly match it.
+    # Rules must be given in cascade order; candidates come back in it.
+    def __init__(self, rules: list[Tuple[Selector, dict]]) -> None:
+        self.by_tag: dict[str, list[Tuple[int, Selector, dict]]] = {}
+        self.by_class: dict[str, list[Tuple[int, Selector, dict]]] = {}
+        self.universal: list[Tuple[int, Selector, dict]] = []
+        for order, (selector, body) in enumerate(rules):
+            key = selector.index_key()
+            if key is None:
+                self.universal.append((order, selector, body))
+            elif key[0] == "tag":
+                self.by_tag.setdefault(key[1], []).append((order, selector, body))
+            else:
+                self.by_class.setdefault(key[1], []).append((order, selector, body))
+
+    def candidates(self, node: Element | Text) -> Iterable[Tuple[int, Selector, dict]]:
+        buckets = [self.universal] if self.universal else []
+        if isinstance(node, Element):
+            if node.tag in self.by_tag:
+                buckets.append(self.by_tag[node.tag])
+            cls = node.attributes.get("class")
+            if cls is not None and cls in self.by_class:
+                buckets.append(self.by_class[cls])
+        if not buckets:
+            return []
+        if len(buckets) == 1:
+            return buckets[0]
+        # Each bucket is already in cascade order, so a merge keeps it
+        return heapq.merge(*buckets)
+
+
+def element_keys(node: Element) -> list[Tuple[str, str]]:
+    keys = [("tag", node.tag)]
+    cls = node.attributes.get("class")
+    if cls is not None:
+        keys.append(("class", cls))
+    return keys
+
+
+def ancestor_filter(node: Element | Text) -> CountingBloomFilter:
+    ancestors = CountingBloomFilter()
+    parent = node.parent
+    while parent:
+        for key in element_keys(parent):
+            ancestors.add(key)
+        parent = parent.parent
+    return ancestors
+
+
+class StyleSharingCache:
+    # Nodes with the same tag, class and inline style under parents with the
+    # same computed style match the same rules: the parents' styles are only
+    # shared when their own ancestors' tags and classes agree. Such nodes can
+    # therefore reuse one immutable computed style.
+    def __init__(self) -> None:
+        # Values keep the parent style alive so its id can't be reused
+        self.entries: dict[tuple, Tuple[Mapping[str, Any], Mapping[str, Any]]] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def key(self, node: Element | Text) -> tuple:
+        parent_style = node.parent.style if node.parent else None
+        if isinstance(node, Element):
+            attributes = node.attributes
+            return (
+                id(parent_style),
+                node.tag,
+                attributes.get("class"),
+                attributes.get("style"),
+            )
+        return (id(parent_style), None, None, None)
+
+    def get(self, key: tuple) -> Optional[Mapping[str, Any]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def store(
+        self, key: tuple, node: Element | Text, computed: Mapping[str, Any]
+    ) -> None:
+        parent_style = node.parent.style if node.parent else EMPTY_STYLE
+        self.entries[key] = (parent_style, computed)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "styles": len(self.entries)}
+
+
+def compute_style(
+    node: Element | Text, rules: RuleIndex, ancestors: CountingBloomFilter
+) -> Mapping[str, Any]:
+    computed: dict = {}
 
     for property, default_value in INHERTIED_PROPERTIES.items():
         if node.parent:
-            node.style[property] = node.parent.style[property]
+            computed[property] = node.parent.style[property]
         else:
-            node.style[property] = default_value
+            computed[property] = default_value
 
-    for selector, body in rules:
-        if not selector.matches(node):
+    for _, selector, body in rules.candidates(node):
+        if not selector.matches(node, ancestors):
             continue
         for property, value in body.items():
-            node.style[property] = value
+            computed[property] = value
 
     if isinstance(node, Element) and node.attributes and "style" in node.attributes:
         pairs: dict = CSSParser(node.attributes["style"]).body()
         for property, value in pairs.items():
-            node.style[property] = value
+            computed[property] = value
 
-    if node.style["font-size"].endswith("%"):
+    if computed["font-size"].endswith("%"):
         if node.parent:
             parent_font_size = node.parent.style["font-size"]
         else:
             parent_font_size = INHERTIED_PROPERTIES["font-size"]
-        node_pct: float = float(node.style["font-size"][:-1]) / 100
+        node_pct: float = float(computed["font-size"][:-1]) / 100
         parent_px: float = float(parent_font_size[:-2])
-        node.style["font-size"] = f"{str(node_pct * parent_px)}px"
+        computed["font-size"] = f"{str(node_pct * parent_px)}px"
 
     if isinstance(node, Element) and node.tag in ["pre", "code"]:
-        node.style["font-family"] = "Courier New"
+        computed["font-family"] = "Courier New"
+
+    return MappingProxyType(computed)
+
+
+def style_node(
+    node: Element | Text,
+    rules: RuleIndex,
+    ancestors: CountingBloomFilter,
+    shared: StyleSharingCache,
+) -> bool:
+    # Returns whether the node's computed style changed
+    previous = node.style
+    cache_key = shared.key(node)
+    computed = shared.get(cache_key)
+    if computed is None:
+        computed = compute_style(node, rules, ancestors)
+        shared.store(cache_key, node, computed)
+    node.style = computed
+    node.style_dirty = False
+    if computed is previous or computed == previous:
+        return False
+    node.mark_layout_dirty()
+    return True
+
+
+def style(
+    node: Element | Text,
+    rules: list[Tuple[Selector, dict]] | RuleIndex,
+    ancestors: Optional[CountingBloomFilter] = None,
+    shared: Optional[StyleSharingCache] = None,
+) -> None:
+    if not isinstance(rules, RuleIndex):
+        rules = RuleIndex(rules)
+    # The filter holds the keys of node's ancestors, so descendant selectors
+    # can rule out most matches without walking up the tree
+    if ancestors is None:
+        ancestors = ancestor_filter(node)
+    if shared is None:
+        shared = StyleSharingCache()
+
+    style_node(node, rules, ancestors, shared)
+
+    if isinstance(node, Text):
+        return
+    node.children_dirty = False
+    if not node.children:
+        return
+    keys = element_keys(node)
+    for key in keys:
+        ancestors.add(key)
+    for child in node.children:
+        style(child, rules, ancestors, shared)
+    for key in keys:
+        ancestors.remove(key)
+
+
+def restyle(
+    node: Element | Text,
+    rules: RuleIndex,
+    ancestors: Optional[CountingBloomFilter] = None,
+    shared: Optional[StyleSharingCache] = None,
+    force: bool = False,
+) -> None:
+    # Like style(), but only visits nodes marked dirty and the subtrees
+    # whose inherited properties they change
+    if not (force or node.style_dirty or node.children_dirty):
+        return
+    if ancestors is None:
+        ancestors = ancestor_filter(node)
+    if shared is None:
+        shared = StyleSharingCache()
+
+    force_children = False
+    if force or node.style_dirty:
+        force_children = style_node(node, rules, ancestors, shared)
 
+    if isinstance(node, Text) or not (force_children or node.children_dirty):
+        return
+    node.children_dirty = False
+    if not node.children:
+        return
+    keys = element_keys(node)
+    for key in keys:
+        ancestors.add(key)
     for child in node.children:
-        style(child, rules)
+        restyle(child, rules, ancestors, shared, force_children)
+    for key in keys:
+        ancestors.remove(key)
@@ -0,0 +1,42 @@
+import heapq
+from typing import Any
+
+from constants import DISPLAY_TILE_HEIGHT
+
+
+class DisplayListIndex:
+    # Buckets display list commands into horizontal tiles by the rows of the
+    # page they cover, so finding what's visible only looks at the tiles in
+    # view rather than the whole list
+    def __init__(self, display_list: list, tile_height: int = DISPLAY_TILE_HEIGHT):
+        self.display_list: list = display_list
+        self.tile_height: int = tile_height
+        # Tile number -> positions in display_list, in paint order
+        self.tiles: dict[int, list[int]] = {}
+        for i, cmd in enumerate(display_list):
+            for tile in range(
+                self._tile(cmd.rect.top), self._tile(cmd.rect.bottom) + 1
+            ):
+                self.tiles.setdefault(tile, []).append(i)
+
+    def _tile(self, y: float) -> int:
+        return int(y // self.tile_height)
+
+    def query(self, top: float, bottom: float) -> list[Any]:
+        # Commands overlapping rows top..bottom, in paint order
+        buckets = [
+            self.tiles[tile]
+            for tile in range(self._tile(top), self._tile(bottom) + 1)
+            if tile in self.tiles
+        ]
+        if len(buckets) == 1:
+            positions: Any = buckets[0]
+        else:
+            # A command spanning several tiles is in each of them
+            positions = dict.fromkeys(heapq.merge(*buckets))
+        commands = []
+        for i in positions:
+            cmd = self.display_list[i]
+            if cmd.rect.top <= bottom and cmd.rect.bottom >= top:
+                commands.append(cmd)
+        return commands
@@ -9,15 +9,21 @@ class DocumentLayout:
         self.node = node
         self.parent = None
         self.children: list[BlockLayout] = []
+        # The width of the page; width narrows to the content width once laid
+        # out, so relayouts start from page_width
+        self.page_width = width
         self.width = width
-        self.height = height
+        self.height: int = height or 0
         self.x: int = 0
         self.y: int = 0
 
     def layout(self):
-        child = BlockLayout(self.node, self, None)
-        self.children.append(child)
-        self.width = self.width - 2 * HSTEP
+        # The block tree persists between layouts, so only the parts that
+        # changed are laid out again
+        if not self.children:
+            self.children.append(BlockLayout(self.node, self, None))
+        child = self.children[0]
+        self.width = self.page_width - 2 * HSTEP
         self.x = HSTEP
         self.y = VSTEP
         child.layout()
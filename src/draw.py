@@ -1,4 +1,7 @@
-import tkinter.font
+import tkinter
+from xml.sax.saxutils import escape, quoteattr
+
+from font_cache import CachedFont
 
 
 class Rect:
@@ -11,11 +14,25 @@ class Rect:
     def contains_point(self, x: int, y: int) -> bool:
         return x >= self.left and x < self.right and y >= self.top and y < self.bottom
 
+    def intersects(self, other: "Rect") -> bool:
+        return (
+            self.left < other.right
+            and other.left < self.right
+            and self.top < other.bottom
+            and other.top < self.bottom
+        )
+
+    def to_json(self) -> dict:
+        return {
+            "left": self.left,
+            "top": self.top,
+            "right": self.right,
+            "bottom": self.bottom,
+        }
+
 
 class DrawText:
-    def __init__(
-        self, x1: int, y1: int, text: str, font: tkinter.font.Font, color: str
-    ):
+    def __init__(self, x1: int, y1: int, text: str, font: CachedFont, color: str):
         self.rect = Rect(
             x1, y1, x1 + font.measure(text), y1 + font.metrics("linespace")
         )
@@ -23,14 +40,46 @@ class DrawText:
         self.font = font
         self.color = color
 
-    def execute(self, scroll, canvas):
-        canvas.create_text(
+    def execute(self, scroll, canvas, tags: tuple = ()) -> int:
+        return canvas.create_text(
             self.rect.left,
             self.rect.top - scroll,
             text=self.text,
             font=self.font,
             anchor="nw",
             fill=self.color,
+            tags=tags,
+        )
+
+    def key(self) -> tuple:
+        # Equal keys draw identical canvas items, apart from scrolling
+        return (
+            "text",
+            self.rect.left,
+            self.rect.top,
+            self.text,
+            str(self.font),
+            self.color,
+        )
+
+    def to_json(self) -> dict:
+        return {
+            "type": "text",
+            "rect": self.rect.to_json(),
+            "text": self.text,
+            "font": self.font.actual(),
+            "color": self.color,
+        }
+
+    def to_svg(self) -> str:
+        font = self.font.actual()
+        font_style = "italic" if font["slant"] == "italic" else "normal"
+        return (
+            f'<text x="{self.rect.left}" y="{self.rect.top}" '
+            f"font-family={quoteattr(font['family'])} "
+            f'font-size="{font["size"]}pt" font-weight="{font["weight"]}" '
+            f'font-style="{font_style}" fill={quoteattr(self.color)} '
+            f'dominant-baseline="text-before-edge">{escape(self.text)}</text>'
         )
 
 
@@ -40,14 +89,34 @@ class DrawOutline:
         self.color = color
         self.thickness = thickness
 
-    def execute(self, scroll, canvas: tkinter.Canvas):
-        canvas.create_rectangle(
+    def execute(self, scroll, canvas: tkinter.Canvas, tags: tuple = ()) -> int:
+        return canvas.create_rectangle(
             self.rect.left,
             self.rect.top - scroll,
             self.rect.right,
             self.rect.bottom - scroll,
             width=self.thickness,
             outline=self.color,
+            tags=tags,
+        )
+
+    def key(self) -> tuple:
+        return ("outline", *self.rect.to_json().values(), self.color, self.thickness)
+
+    def to_json(self) -> dict:
+        return {
+            "type": "outline",
+            "rect": self.rect.to_json(),
+            "color": self.color,
+            "thickness": self.thickness,
+        }
+
+    def to_svg(self) -> str:
+        return (
+            f'<rect x="{self.rect.left}" y="{self.rect.top}" '
+            f'width="{self.rect.right - self.rect.left}" '
+            f'height="{self.rect.bottom - self.rect.top}" fill="none" '
+            f'stroke={quoteattr(self.color)} stroke-width="{self.thickness}"/>'
         )
 
 
@@ -56,15 +125,29 @@ class DrawRect:
         self.rect = rect
         self.color = color
 
-    def execute(self, scroll, canvas):
-        canvas.create_rectangle(
+    def execute(self, scroll, canvas, tags: tuple = ()) -> int:
+        return canvas.create_rectangle(
             self.rect.left,
             self.rect.top - scroll,
             self.rect.right,
             self.rect.bottom - scroll,
             width=0,
             fill=self.color,
-            tag="text",
+            tags=("text", *tags),
+        )
+
+    def key(self) -> tuple:
+        return ("rect", *self.rect.to_json().values(), self.color)
+
+    def to_json(self) -> dict:
+        return {"type": "rect", "rect": self.rect.to_json(), "color": self.color}
+
+    def to_svg(self) -> str:
+        return (
+            f'<rect x="{self.rect.left}" y="{self.rect.top}" '
+            f'width="{self.rect.right - self.rect.left}" '
+            f'height="{self.rect.bottom - self.rect.top}" '
+            f"fill={quoteattr(self.color)}/>"
         )
 
 
@@ -74,12 +157,31 @@ class DrawLine:
         self.color = color
         self.thickness = thickness
 
-    def execute(self, scroll, canvas):
-        canvas.create_line(
+    def execute(self, scroll, canvas, tags: tuple = ()) -> int:
+        return canvas.create_line(
             self.rect.left,
             self.rect.top - scroll,
             self.rect.right,
             self.rect.bottom - scroll,
             fill=self.color,
             width=self.thickness,
+            tags=tags,
+        )
+
+    def key(self) -> tuple:
+        return ("line", *self.rect.to_json().values(), self.color, self.thickness)
+
+    def to_json(self) -> dict:
+        return {
+            "type": "line",
+            "rect": self.rect.to_json(),
+            "color": self.color,
+            "thickness": self.thickness,
+        }
+
+    def to_svg(self) -> str:
+        return (
+            f'<line x1="{self.rect.left}" y1="{self.rect.top}" '
+            f'x2="{self.rect.right}" y2="{self.rect.bottom}" '
+            f'stroke={quoteattr(self.color)} stroke-width="{self.thickness}"/>'
         )
@@ -1,7 +1,99 @@
-import tkinter
-from typing import Literal, Optional
+from collections import OrderedDict
+from typing import Any, Iterable, Literal, Optional
 
-FONTS = {}
+from constants import MEASURE_CACHE_SIZE
+from font_metrics import FontBackend, TkFontBackend
+
+
+class CachedFont:
+    # Wraps a backend font so repeated measurements of the same string, and
+    # the font's metrics, don't each make a round trip into Tcl
+    def __init__(self, font: Any, max_entries: int = MEASURE_CACHE_SIZE) -> None:
+        # The backend's font, e.g. a tkinter.font.Font
+        self.font: Any = font
+        self.max_entries: int = max_entries
+        self.widths: OrderedDict[str, int] = OrderedDict()
+        self._metrics: Optional[dict[str, Any]] = None
+        self.hits: int = 0
+        self.misses: int = 0
+        # Widths measure_many stored that nobody has read yet; their miss
+        # was counted by the batch, so the first read isn't a hit
+        self.prefetched: set[str] = set()
+        # Measurements the backend font made, counting a batch as one
+        self.tk_calls: int = 0
+
+    def measure(self, text: str) -> int:
+        width = self.widths.get(text)
+        if width is not None:
+            self.widths.move_to_end(text)
+            if text in self.prefetched:
+                self.prefetched.discard(text)
+            else:
+                self.hits += 1
+            return width
+        self.misses += 1
+        self.tk_calls += 1
+        width = self.font.measure(text)
+        self._store(text, width)
+        return width
+
+    def measure_many(self, texts: Iterable[str]) -> None:
+        # Fills the cache for all of texts with a single Tcl evaluation
+        missing = [text for text in dict.fromkeys(texts) if text not in self.widths]
+        if not missing:
+            return
+        self.misses += len(missing)
+        for text, width in zip(missing, self._measure_batch(missing)):
+            self._store(text, width)
+            self.prefetched.add(text)
+
+    def _measure_batch(self, texts: list[str]) -> list[int]:
+        tk = getattr(self.font, "_tk", None)
+        if tk is None:
+            # Fonts not backed by a Tcl interpreter are measured one by one
+            self.tk_calls += len(texts)
+            return [self.font.measure(text) for text in texts]
+        self.tk_calls += 1
+        widths = tk.call(
+            "lmap", "text", tuple(texts), f"font measure {self.font.name} $text"
+        )
+        return [tk.getint(width) for width in tk.splitlist(widths)]
+
+    def _store(self, text: str, width: int) -> None:
+        self.widths[text] = width
+        if len(self.widths) > self.max_entries:
+            evicted, _ = self.widths.popitem(last=False)
+            self.prefetched.discard(evicted)
+
+    def metrics(self, name: Optional[str] = None) -> Any:
+        metrics = self._metrics
+        if metrics is None:
+            metrics = self._metrics = dict(self.font.metrics().items())
+        if name:
+            return metrics[name]
+        return metrics
+
+    def __getattr__(self, name: str) -> Any:
+        # Everything else (actual(), configure(), ...) goes to the font
+        if name == "font":
+            raise AttributeError(name)
+        return getattr(self.font, name)
+
+    def __str__(self) -> str:
+        # Tk options take the font's name, so the wrapper can be passed
+        # wherever the font itself could
+        return str(self.font)
+
+
+FONTS: dict[tuple, CachedFont] = {}
+FONT_BACKEND: FontBackend = TkFontBackend()
+
+
+def set_font_backend(backend: FontBackend) -> None:
+    # Fonts from the previous backend are dropped along with their widths
+    global FONT_BACKEND
+    FONT_BACKEND = backend
+    FONTS.clear()
 
 
 def get_font(
@@ -9,18 +101,20 @@ def get_font(
     weight: Literal["bold", "normal"],
     style: Literal["roman", "italic"],
     family: Optional[str] = None,
-) -> tkinter.font.Font:
+) -> CachedFont:
     key: tuple = (size, weight, style, family)
     if key not in FONTS:
-        font: tkinter.font.Font
         if style not in ["roman", "italic"]:
             style = "roman"
-        if not family:
-            font = tkinter.font.Font(size=size, weight=weight, slant=style)
-        else:
-            font = tkinter.font.Font(
-                size=size, weight=weight, slant=style, family=family
-            )
-        label: tkinter.Label = tkinter.Label(font=font)
-        FONTS[key] = (font, label)
-    return FONTS[key][0]
+        FONTS[key] = CachedFont(FONT_BACKEND.create_font(size, weight, style, family))
+    return FONTS[key]
+
+
+def measure_stats() -> dict[str, int]:
+    fonts = list(FONTS.values())
+    return {
+        "hits": sum(font.hits for font in fonts),
+        "misses": sum(font.misses for font in fonts),
+        "tk_calls": sum(font.tk_calls for font in fonts),
+        "entries": sum(len(font.widths) for font in fonts),
+    }
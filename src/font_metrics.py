@@ -0,0 +1,131 @@
+import math
+import tkinter
+import tkinter.font
+from abc import ABC, abstractmethod
+from typing import Any, Literal, Optional
+
+from constants import MONOSPACE_FAMILIES, POINTS_TO_PIXELS
+
+# Advance widths of printable ASCII in Helvetica, in 1/1000 em
+PROPORTIONAL_WIDTHS: dict[str, int] = dict(
+    zip(
+        " !\"#$%&'()*+,-./0123456789:;<=>?@"
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`"
+        "abcdefghijklmnopqrstuvwxyz{|}~",
+        [278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333]
+        + [278, 278, 556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278]
+        + [278, 584, 584, 584, 556, 1015, 667, 667, 722, 722, 667, 611, 778]
+        + [722, 278, 500, 667, 556, 833, 722, 778, 667, 778, 722, 667, 611]
+        + [722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556, 333, 556]
+        + [556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556]
+        + [556, 556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334]
+        + [260, 334, 584],
+    )
+)
+DEFAULT_WIDTH = 556
+MONOSPACE_WIDTH = 600
+# Bold faces are drawn wider; this stands in for separate bold tables
+BOLD_WIDTH_FACTOR = 1.1
+
+
+class FontBackend(ABC):
+    # Creates the fonts get_font hands to layout. A font needs measure(text)
+    # returning a width in pixels and metrics(name=None) returning
+    # "ascent", "descent" and "linespace" in pixels
+    @abstractmethod
+    def create_font(
+        self,
+        size: int,
+        weight: Literal["bold", "normal"],
+        style: Literal["roman", "italic"],
+        family: Optional[str] = None,
+    ) -> Any: ...
+
+
+class TkFontBackend(FontBackend):
+    # Real Tk fonts; needs a display
+    def __init__(self) -> None:
+        # A label per font keeps Tk from dropping the font's cached layout
+        # data between measurements
+        self.labels: list[tkinter.Label] = []
+
+    def create_font(self, size, weight, style, family=None) -> tkinter.font.Font:
+        font: tkinter.font.Font
+        if not family:
+            font = tkinter.font.Font(size=size, weight=weight, slant=style)
+        else:
+            font = tkinter.font.Font(
+                size=size, weight=weight, slant=style, family=family
+            )
+        self.labels.append(tkinter.Label(font=font))
+        return font
+
+
+class FixedMetricsFont:
+    # Measures text from a table of character advances instead of asking
+    # Tk, so layout runs without a display and without Tcl round trips
+    def __init__(
+        self,
+        size: int,
+        weight: Literal["bold", "normal"],
+        slant: Literal["roman", "italic"],
+        family: Optional[str] = None,
+    ) -> None:
+        self.size: int = size
+        self.weight: Literal["bold", "normal"] = weight
+        self.slant: Literal["roman", "italic"] = slant
+        self.family: Optional[str] = family
+        pixels = abs(size) * POINTS_TO_PIXELS
+        scale = pixels / 1000
+        if weight == "bold":
+            scale *= BOLD_WIDTH_FACTOR
+        self.monospace: bool = family in MONOSPACE_FAMILIES
+        if self.monospace:
+            self.advances: dict[str, float] = {}
+            self.default_advance: float = MONOSPACE_WIDTH * scale
+        else:
+            self.advances = {
+                char: width * scale for char, width in PROPORTIONAL_WIDTHS.items()
+            }
+            self.default_advance = DEFAULT_WIDTH * scale
+        ascent = math.ceil(pixels * (0.83 if self.monospace else 0.91))
+        descent = math.ceil(pixels * (0.3 if self.monospace else 0.21))
+        self._metrics: dict[str, int] = {
+            "ascent": ascent,
+            "descent": descent,
+            "linespace": ascent + descent,
+            "fixed": int(self.monospace),
+        }
+
+    def measure(self, text: str) -> int:
+        if self.monospace:
+            return round(len(text) * self.default_advance)
+        advances, default = self.advances, self.default_advance
+        return round(sum([advances.get(char, default) for char in text]))
+
+    def metrics(self, name: Optional[str] = None) -> Any:
+        if name:
+            return self._metrics[name]
+        return dict(self._metrics)
+
+    def actual(self) -> dict[str, Any]:
+        # The same description tkinter.font.Font.actual() gives
+        return {
+            "family": self.family or "TkDefaultFont",
+            "size": self.size,
+            "weight": self.weight,
+            "slant": self.slant,
+            "underline": 0,
+            "overstrike": 0,
+        }
+
+    def __str__(self) -> str:
+        # Lets the font be passed as a Tk font option, as a font description
+        weight = "bold" if self.weight == "bold" else ""
+        slant = "italic" if self.slant == "italic" else ""
+        return f"{{{self.family or 'TkDefaultFont'}}} {self.size} {weight} {slant}"
+
+
+class FixedMetricsFontBackend(FontBackend):
+    def create_font(self, size, weight, style, family=None) -> FixedMetricsFont:
+        return FixedMetricsFont(size, weight, style, family)
@@ -0,0 +1,86 @@
+import json
+import os
+import sys
+import traceback
+
+from constants import HEIGHT, VSTEP, WIDTH
+from font_cache import set_font_backend
+from font_metrics import FixedMetricsFontBackend
+from tab import Tab
+from url import URL
+
+OUTPUT_FORMATS = [".json", ".svg"]
+
+
+def output_paths(out: str, count: int) -> list[str]:
+    # With several pages, each gets its number before the extension
+    if count == 1:
+        return [out]
+    root, extension = os.path.splitext(out)
+    return [f"{root}-{i}{extension}" for i in range(1, count + 1)]
+
+
+def render_page(url: URL, width: int = WIDTH, height: int = HEIGHT) -> Tab:
+    # Without a loader the tab fetches, styles, lays out and paints before
+    # load() returns
+    tab = Tab(height, screen_height=height, screen_width=width)
+    tab.load(url)
+    return tab
+
+
+def page_to_json(tab: Tab, url: str) -> str:
+    return json.dumps(
+        {
+            "url": url,
+            "width": tab.screen_width,
+            "height": tab.document.height,
+            "display_list": [cmd.to_json() for cmd in tab.display_list],
+        },
+        indent=2,
+    )
+
+
+def page_to_svg(tab: Tab) -> str:
+    height = tab.document.height + 2 * VSTEP
+    lines = [
+        '<svg xmlns="http://www.w3.org/2000/svg" '
+        f'width="{tab.screen_width}" height="{height}">',
+        '<rect width="100%" height="100%" fill="white"/>',
+    ]
+    lines.extend(cmd.to_svg() for cmd in tab.display_list)
+    lines.append("</svg>")
+    return "\n".join(lines) + "\n"
+
+
+def write_page(tab: Tab, url: str, path: str) -> None:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".svg":
+        output = page_to_svg(tab)
+    else:
+        output = page_to_json(tab, url)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(output)
+
+
+def render_pages(urls: list[str], out: str, width: int = WIDTH) -> int:
+    # Returns the process exit status: 1 if any page failed to render
+    if os.path.splitext(out)[1].lower() not in OUTPUT_FORMATS:
+        raise ValueError(f"Output must end in one of {', '.join(OUTPUT_FORMATS)}")
+    # Nothing is drawn, so fonts are measured without Tk
+    set_font_backend(FixedMetricsFontBackend())
+    status = 0
+    for url, path in zip(urls, output_paths(out, len(urls))):
+        try:
+            tab = render_page(URL(url), width)
+            if tab.nodes is None:
+                print(f"No content at {url}", file=sys.stderr)
+                status = 1
+                continue
+            write_page(tab, url, path)
+        except OSError as e:
+            print(f"Could not render {url}: {e}", file=sys.stderr)
+            status = 1
+        except Exception as e:
+            traceback.print_exception(e)
+            status = 1
+    return status
@@ -0,0 +1,42 @@
+from parser import Element, Text
+from typing import Any, Optional
+
+from constants import DISPLAY_TILE_HEIGHT
+from helpers import tree_to_list
+
+
+class HitTestIndex:
+    # Buckets layout objects into horizontal tiles, like DisplayListIndex
+    # does for draw commands, so a click only tests the boxes in its tile.
+    # Also maps each DOM node to the layout objects generated for it.
+    def __init__(self, document, tile_height: int = DISPLAY_TILE_HEIGHT):
+        self.tile_height: int = tile_height
+        # Hit-testable layout objects in tree order
+        self.objects: list[Any] = []
+        # Tile number -> positions in objects, in tree order
+        self.tiles: dict[int, list[int]] = {}
+        self.boxes: dict[Element | Text, list[Any]] = {}
+        for obj in tree_to_list(document, []):
+            self.boxes.setdefault(obj.node, []).append(obj)
+            # Objects without a position (e.g. empty lines) never take clicks
+            if not (obj.x and obj.y):
+                continue
+            position = len(self.objects)
+            self.objects.append(obj)
+            for tile in range(self._tile(obj.y), self._tile(obj.y + obj.height) + 1):
+                self.tiles.setdefault(tile, []).append(position)
+
+    def _tile(self, y: float) -> int:
+        return int(y // self.tile_height)
+
+    def hit(self, x: float, y: float) -> Optional[Any]:
+        # The innermost object containing the point: children come after
+        # their ancestors in tree order, so take the last match
+        for position in reversed(self.tiles.get(self._tile(y), [])):
+            obj = self.objects[position]
+            if obj.x <= x < obj.x + obj.width and obj.y <= y < obj.y + obj.height:
+                return obj
+        return None
+
+    def boxes_for(self, node: Element | Text) -> list[Any]:
+        return self.boxes.get(node, [])
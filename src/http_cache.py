@@ -0,0 +1,284 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from constants import HTTP_CACHE_MAX_BYTES
+from typedclasses import HTTPResponse
+
+
+def parse_cache_control(value: str) -> dict[str, Optional[str]]:
+    directives: dict[str, Optional[str]] = {}
+    for directive in value.split(","):
+        directive = directive.strip()
+        if not directive:
+            continue
+        if "=" in directive:
+            name, arg = directive.split("=", 1)
+            directives[name.strip().casefold()] = arg.strip().strip('"')
+        else:
+            directives[directive.casefold()] = None
+    return directives
+
+
+def _parse_http_date(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class CacheEntry:
+    status: int
+    headers: dict[str, str]
+    body: str
+    stored_at: float
+
+    def size(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers.items())
+
+    def freshness_lifetime(self) -> float:
+        cache_control = parse_cache_control(self.headers.get("cache-control", ""))
+        if "no-cache" in cache_control:
+            return 0
+        max_age = cache_control.get("max-age")
+        if max_age is not None:
+            try:
+                return max(int(max_age), 0)
+            except ValueError:
+                return 0
+        if "expires" in self.headers:
+            expires = _parse_http_date(self.headers["expires"])
+            date = _parse_http_date(self.headers.get("date", "")) or self.stored_at
+            if expires is not None:
+                return max(expires - date, 0)
+        return 0
+
+    def current_age(self) -> float:
+        try:
+            age = float(self.headers.get("age", 0))
+        except ValueError:
+            age = 0
+        return age + time.time() - self.stored_at
+
+    def is_fresh(self) -> bool:
+        return self.current_age() < self.freshness_lifetime()
+
+    def validators(self) -> dict[str, str]:
+        headers = {}
+        if "etag" in self.headers:
+            headers["If-None-Match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+
+class HTTPCache:
+    def __init__(
+        self, max_bytes: int = HTTP_CACHE_MAX_BYTES, directory: Optional[str] = None
+    ) -> None:
+        self.max_bytes: int = max_bytes
+        self.entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self.size: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.revalidations: int = 0
+        self.evictions: int = 0
+        self.disk_evictions: int = 0
+        self.lock = threading.Lock()
+        self.directory = directory
+
+    @property
+    def directory(self) -> Optional[str]:
+        # On-disk entries survive restarts; None keeps the cache in memory only
+        return self._directory
+
+    @directory.setter
+    def directory(self, directory: Optional[str]) -> None:
+        self._directory: Optional[str] = directory
+        # Bytes of entries on disk, scanned the first time it's needed and
+        # tracked from then on
+        self.disk_size: Optional[int] = None
+
+    def is_storable(self, response: HTTPResponse) -> bool:
+        if response.status != 200:
+            return False
+        cache_control = parse_cache_control(response.headers.get("cache-control", ""))
+        if "no-store" in cache_control:
+            return False
+        return any(
+            header in response.headers
+            for header in ["etag", "last-modified", "expires"]
+        ) or ("max-age" in cache_control)
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is not None:
+                self.entries.move_to_end(url)
+                return entry
+            entry = self._read_disk(url)
+            if entry is not None:
+                self._insert(url, entry)
+            return entry
+
+    def lookup(self, url: str) -> tuple[Optional[CacheEntry], bool]:
+        # Returns the stored entry for url and whether it can be used as-is
+        entry = self.get(url)
+        fresh = entry is not None and entry.is_fresh()
+        with self.lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry, fresh
+
+    def store(self, url: str, response: HTTPResponse) -> None:
+        if not self.is_storable(response):
+            self.remove(url)
+            return
+        entry = CacheEntry(
+            status=response.status,
+            headers=dict(response.headers),
+            body=response.body,
+            stored_at=time.time(),
+        )
+        with self.lock:
+            self._insert(url, entry)
+            self._write_disk(url, entry)
+
+    def revalidated(
+        self, url: str, entry: CacheEntry, headers: dict[str, str]
+    ) -> CacheEntry:
+        # A 304 response refreshes the stored headers but keeps the stored body
+        updated_headers = dict(entry.headers)
+        for header, value in headers.items():
+            if header not in ["content-length", "transfer-encoding"]:
+                updated_headers[header] = value
+        refreshed = CacheEntry(
+            status=entry.status,
+            headers=updated_headers,
+            body=entry.body,
+            stored_at=time.time(),
+        )
+        with self.lock:
+            self.revalidations += 1
+            self._insert(url, refreshed)
+            self._write_disk(url, refreshed)
+        return refreshed
+
+    def remove(self, url: str) -> None:
+        with self.lock:
+            entry = self.entries.pop(url, None)
+            if entry is not None:
+                self.size -= entry.size()
+            path = self._disk_path(url)
+            if path and os.path.exists(path):
+                self._remove_file(path)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries = OrderedDict()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.revalidations = 0
+            self.evictions = 0
+            self.disk_evictions = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+            "disk_evictions": self.disk_evictions,
+            "entries": len(self.entries),
+            "bytes": self.size,
+        }
+
+    def _insert(self, url: str, entry: CacheEntry) -> None:
+        previous = self.entries.pop(url, None)
+        if previous is not None:
+            self.size -= previous.size()
+        if entry.size() > self.max_bytes:
+            return
+        self.entries[url] = entry
+        self.size += entry.size()
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted.size()
+            self.evictions += 1
+
+    def _disk_path(self, url: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        digest = hashlib.sha256(url.encode("utf8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _read_disk(self, url: str) -> Optional[CacheEntry]:
+        path = self._disk_path(url)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = CacheEntry(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+        # Touch the file so disk eviction sees it as recently used
+        os.utime(path)
+        return entry
+
+    def _write_disk(self, url: str, entry: CacheEntry) -> None:
+        path = self._disk_path(url)
+        if not path or not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        disk_size = self._disk_size()
+        if os.path.exists(path):
+            disk_size -= os.path.getsize(path)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(asdict(entry), f)
+        self.disk_size = disk_size + os.path.getsize(path)
+        # The directory is only listed when the tracked size is over the cap
+        if self.disk_size > self.max_bytes:
+            self._evict_disk()
+
+    def _disk_paths(self) -> list[str]:
+        assert self.directory
+        if not os.path.isdir(self.directory):
+            return []
+        return [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".json")
+        ]
+
+    def _disk_size(self) -> int:
+        if self.disk_size is None:
+            self.disk_size = sum(os.path.getsize(path) for path in self._disk_paths())
+        return self.disk_size
+
+    def _remove_file(self, path: str) -> None:
+        size = os.path.getsize(path)
+        os.remove(path)
+        if self.disk_size is not None:
+            self.disk_size -= size
+
+    def _evict_disk(self) -> None:
+        paths = self._disk_paths()
+        paths.sort(key=os.path.getmtime)
+        # Rescanning also picks up files other processes wrote
+        self.disk_size = sum(os.path.getsize(path) for path in paths)
+        while paths and self.disk_size > self.max_bytes:
+            self._remove_file(paths.pop(0))
+            self.disk_evictions += 1
+
+
+HTTP_CACHE = HTTPCache()
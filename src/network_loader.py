@@ -0,0 +1,110 @@
+import concurrent.futures
+import queue
+import socket
+import threading
+import time
+from typing import Any, Callable
+
+from constants import LOAD_POLL_MS, MAX_PAGE_LOADS, PAGE_LOAD_TIMEOUT
+
+
+class LoadHandle:
+    # One page load: whether it was cancelled, the deadline it must finish
+    # by, and the sockets it is reading from, so cancelling can unblock them
+    def __init__(self, timeout: float = PAGE_LOAD_TIMEOUT) -> None:
+        self._cancelled = threading.Event()
+        self.deadline: float = time.monotonic() + timeout
+        self.sockets: set[socket.socket] = set()
+        self.lock = threading.Lock()
+
+    def cancel(self) -> None:
+        with self.lock:
+            self._cancelled.set()
+            sockets, self.sockets = self.sockets, set()
+        for s in sockets:
+            abort_socket(s)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+    def remaining(self) -> float:
+        return max(self.deadline - time.monotonic(), 0)
+
+    def attach(self, s: socket.socket) -> None:
+        with self.lock:
+            if not self.cancelled:
+                self.sockets.add(s)
+                return
+        abort_socket(s)
+
+    def detach(self, s: socket.socket) -> bool:
+        # Returns whether the socket is still usable, i.e. it wasn't aborted
+        with self.lock:
+            self.sockets.discard(s)
+            return not self.cancelled
+
+
+def abort_socket(s: socket.socket) -> None:
+    # shutdown() wakes a thread blocked reading the socket; close() alone
+    # doesn't
+    try:
+        s.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    s.close()
+
+
+class NetworkLoader:
+    # Runs blocking network jobs on worker threads and hands their results
+    # back on the Tk thread, which polls a queue with after() because
+    # tkinter calls are not safe from other threads
+    def __init__(self, window, poll_interval: int = LOAD_POLL_MS) -> None:
+        self.window = window
+        self.poll_interval: int = poll_interval
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=MAX_PAGE_LOADS, thread_name_prefix="page-load"
+        )
+        self.results: queue.Queue = queue.Queue()
+        self.pending: int = 0
+        self.polling: bool = False
+
+    def submit(
+        self,
+        job: Callable[[LoadHandle], Any],
+        on_done: Callable[[Any], None],
+        on_error: Callable[[Exception], None],
+    ) -> LoadHandle:
+        handle = LoadHandle()
+        self.pending += 1
+        self.executor.submit(self._run, handle, job, on_done, on_error)
+        if not self.polling:
+            self.polling = True
+            self.window.after(self.poll_interval, self.poll)
+        return handle
+
+    def _run(self, handle: LoadHandle, job, on_done, on_error) -> None:
+        try:
+            result = job(handle)
+        except Exception as e:
+            self.results.put((handle, on_error, e))
+        else:
+            self.results.put((handle, on_done, result))
+
+    def poll(self) -> None:
+        while True:
+            try:
+                handle, callback, result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            if not handle.cancelled:
+                callback(result)
+        if self.pending:
+            self.window.after(self.poll_interval, self.poll)
+        else:
+            self.polling = False
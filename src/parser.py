@@ -1,4 +1,9 @@
-from typing import Any, Optional, Tuple
+import html
+import re
+import sys
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Tuple
+
 from constants import (
     SELF_CLOSING_TAGS,
     HEAD_TAGS,
@@ -8,34 +13,115 @@ from constants import (
     CLOSING_HEAD_TAG,
     CLOSING_HTML_TAG,
     BODY_TAG,
+    INITIAL_MODE,
+    BEFORE_HEAD_MODE,
+    IN_HEAD_MODE,
+    IN_BODY_MODE,
 )
 
+# Everything up to the ">" closing a tag, skipping over quoted values
+TAG_CONTENTS = re.compile(r"""([^>"']*(?:(?:"[^"]*"|'[^']*')[^>"']*)*)>""")
+# The tag name and attributes, split on whitespace outside quotes
+TAG_PARTS = re.compile(r"""(?:[^\s"']|"[^"]*"|'[^']*')+""")
+QUOTED = re.compile(r""""([^"]*)"|'([^']*)'""")
+
+
+# Shared by every node that has no attributes or has not been styled yet
+EMPTY_ATTRIBUTES: Mapping[str, str] = MappingProxyType({})
+EMPTY_STYLE: Mapping[str, Any] = MappingProxyType({})
+
 
 class Text:
+    __slots__ = ("text", "parent", "style", "style_dirty", "layout_dirty")
+
+    # Text nodes never have children, so they all share one empty tuple
+    children: tuple = ()
+    children_dirty: bool = False
+
     def __init__(self, text: str, parent: "Element"):
         self.text: str = text
-        self.children: list[Element | Text] = []
         self.parent: Element = parent
-        self.style: dict = {}
-        self.priority: int = 0
+        self.style: Mapping[str, Any] = EMPTY_STYLE
+        # New nodes have never been styled or laid out
+        self.style_dirty: bool = True
+        self.layout_dirty: bool = True
+
+    def mark_layout_dirty(self) -> None:
+        self.layout_dirty = True
+        self.parent.mark_layout_dirty()
 
     def __repr__(self) -> str:
         return repr(self.text)
 
 
 class Element:
+    __slots__ = (
+        "tag",
+        "children",
+        "parent",
+        "_attributes",
+        "style",
+        "style_dirty",
+        "children_dirty",
+        "layout_dirty",
+    )
+
     def __init__(
         self,
         tag: str,
         attributes: Optional[dict] = None,
         parent: Optional["Element"] = None,
     ):
-        self.tag: str = tag
+        self.tag: str = sys.intern(tag)
         self.children: list[Element | Text] = []
         self.parent: Optional[Element] = parent
-        self.attributes: Optional[dict] = attributes
-        self.style: dict[str, Any] = {}
-        self.priority: int = 0
+        # Most elements have no attributes; only allocate a dict for those
+        # that do
+        self._attributes: Optional[dict] = attributes or None
+        self.style: Mapping[str, Any] = EMPTY_STYLE
+        # style_dirty means this node's style must be recomputed;
+        # children_dirty means some descendant's style must be
+        self.style_dirty: bool = True
+        self.children_dirty: bool = True
+        # layout_dirty means this node or a descendant changed size since
+        # it was last laid out
+        self.layout_dirty: bool = True
+
+    @property
+    def attributes(self) -> Mapping[str, str]:
+        return self._attributes if self._attributes is not None else EMPTY_ATTRIBUTES
+
+    def set_attribute(self, key: str, value: str) -> None:
+        if self._attributes is None:
+            self._attributes = {}
+        self._attributes[sys.intern(key)] = value
+        # Classes also decide which descendant selectors match below this
+        # node, so the whole subtree has to be restyled
+        if key == "class":
+            self.mark_style_dirty(subtree=True)
+        elif key == "style":
+            self.mark_style_dirty()
+
+    def mark_style_dirty(self, subtree: bool = False) -> None:
+        self.style_dirty = True
+        if subtree:
+            stack: list[Element | Text] = [self]
+            while stack:
+                node = stack.pop()
+                node.style_dirty = True
+                if isinstance(node, Element):
+                    node.children_dirty = True
+                    stack.extend(node.children)
+        parent = self.parent
+        while parent and not parent.children_dirty:
+            parent.children_dirty = True
+            parent = parent.parent
+
+    def mark_layout_dirty(self) -> None:
+        node: Optional[Element] = self
+        while node and not node.layout_dirty:
+            node.layout_dirty = True
+            node = node.parent
 
     def __repr__(self) -> str:
         return f"<{self.tag}>"
@@ -53,20 +139,43 @@ class Element:
 
 class HTMLParser:
     def replace_character_references(self, s: str) -> str:
-        s = s.replace("&lt;", "<")
-        s = s.replace("&gt;", ">")
-        return s
+        # html.unescape decodes every named reference in the HTML5 table and
+        # all numeric ones in a single regex pass
+        if "&" not in s:
+            return s
+        return html.unescape(s)
 
-    def __init__(self, body: str) -> None:
+    def __init__(self, body: str = "") -> None:
         self.body: str = body
         self.unfinished: list[Element] = []
+        # How many elements with each tag are open, so checks like "is a
+        # <p> open?" need not scan self.unfinished
+        self.open_tag_counts: dict[str, int] = {}
+        # Lexer state lives on the parser so that lexing can pause at the
+        # end of one fed chunk and resume with the next
+        self.pos: int = 0  # next index of self.body to lex
+        self.in_script: bool = False
+
+    def insertion_mode(self) -> str:
+        # Implicit tags only depend on the bottom two open elements, so the
+        # mode is read off the stack in constant time
+        depth = len(self.unfinished)
+        if depth == 0:
+            return INITIAL_MODE
+        if depth > 2 or self.unfinished[0].tag != HTML_TAG:
+            return IN_BODY_MODE
+        if depth == 1:
+            return BEFORE_HEAD_MODE
+        if self.unfinished[1].tag == HEAD_TAG:
+            return IN_HEAD_MODE
+        return IN_BODY_MODE
 
     def implicit_tags(self, tag: Optional[str] = None) -> None:
         while True:
-            open_tags = [node.tag for node in self.unfinished]
-            if open_tags == [] and tag != HTML_TAG:
+            mode = self.insertion_mode()
+            if mode == INITIAL_MODE and tag != HTML_TAG:
                 self.add_tag(HTML_TAG)
-            elif open_tags == [HTML_TAG] and tag not in [
+            elif mode == BEFORE_HEAD_MODE and tag not in [
                 HEAD_TAG,
                 BODY_TAG,
                 CLOSING_HTML_TAG,
@@ -76,17 +185,27 @@ class HTMLParser:
                 else:
                     self.add_tag(BODY_TAG)
             elif (
-                open_tags == [HTML_TAG, HEAD_TAG]
-                and tag not in [CLOSING_HEAD_TAG] + HEAD_TAGS
+                mode == IN_HEAD_MODE
+                and tag != CLOSING_HEAD_TAG
+                and tag not in HEAD_TAGS
             ):
                 self.add_tag(CLOSING_HEAD_TAG)
             else:
                 break
 
+    def push(self, node: Element) -> None:
+        self.unfinished.append(node)
+        self.open_tag_counts[node.tag] = self.open_tag_counts.get(node.tag, 0) + 1
+
+    def pop(self) -> Element:
+        node = self.unfinished.pop()
+        self.open_tag_counts[node.tag] -= 1
+        return node
+
     def get_attributes(
         self, text: str, attributes: Optional[list] = []
     ) -> Tuple[str, dict]:
-        tag: str = text.casefold()
+        tag: str = sys.intern(text.casefold())
         attrs_dict: dict = {}
         if attributes:
             for attrpair in attributes:
@@ -95,101 +214,88 @@ class HTMLParser:
                     # fmt: off
                     if len(value) > 2 and value[0] in ["'", '\"']:
                         value = value[1:-1]
-                    attrs_dict[key.casefold()] = value
+                    attrs_dict[sys.intern(key.casefold())] = (
+                        self.replace_character_references(value)
+                    )
                 else:
-                    attrs_dict[attrpair.casefold()] = ""
+                    attrs_dict[sys.intern(attrpair.casefold())] = ""
         return tag, attrs_dict
 
     def parse(self) -> Element | Text:
         self.lexer()
         return self.finish()
 
-    def _started_comment_tag(self, i: int, body_length: int) -> bool:
-        return i + 4 < body_length and self.body[i + 1 : i + 4] == "!--"
-
-    def _finished_comment_tag(self, i: int, in_comment: bool) -> bool:
-        return i - 2 > 0 and self.body[i - 2 : i] == "--" and in_comment
-
-    def _finished_script_tag(self, i: int) -> bool:
-        return self.body[i + 1 : i + 8] == "/script"
-
-    def lexer(self) -> None:
-        text: str = ""
-        IN_TAG, IN_COMMENT, IN_SCRIPT, IN_ATTR, IN_QUOTED_ATTR = (
-            False,
-            False,
-            False,
-            False,
-            False,
-        )
-        body_length: int = len(self.body)
-        attributes: list[str] = []
-        current_attribute: str = ""
-
-        for i, c in enumerate(self.body):
-            if c == '"' or c == "'":
-                if IN_QUOTED_ATTR:
-                    IN_QUOTED_ATTR = False
-                    IN_ATTR = True
-                elif IN_ATTR:
-                    IN_QUOTED_ATTR = True
-                    IN_ATTR = False
-            elif c == " " or c == "\n":
-                if IN_QUOTED_ATTR:
-                    current_attribute += c
-                elif IN_TAG:
-                    IN_ATTR = True
-                    if current_attribute:
-                        attributes.append(current_attribute)
-                        current_attribute = ""
-                else:
-                    text += c
-            elif c == "<":
-                if IN_QUOTED_ATTR:
-                    current_attribute += c
-                    continue
-                if IN_COMMENT:
-                    continue
-                if self._started_comment_tag(i, body_length):
-                    IN_COMMENT = True
-                if self._finished_script_tag(i):
-                    IN_SCRIPT = False
-                if IN_SCRIPT:
-                    text += c
-                    continue
-                IN_TAG = True
-                if text:
-                    self.add_text(text)
-                text = ""
-            elif c == ">":
-                if IN_QUOTED_ATTR:
-                    current_attribute += c
-                    continue
-                if self._finished_comment_tag(i, IN_COMMENT):
-                    IN_COMMENT = False
-                    text = ""
-                    continue
-                if IN_SCRIPT:
-                    text += c
-                    continue
-                if text == "script":
-                    IN_SCRIPT = True
-                if IN_ATTR:
-                    attributes.append(current_attribute)
-                    current_attribute = ""
-                self.add_tag(text, attributes)
-                text = ""
-                attributes = []
-                IN_TAG = False
-                IN_ATTR = False
-            else:
-                if IN_QUOTED_ATTR or IN_ATTR:
-                    current_attribute += c
-                    continue
-                text += c
+    def feed(self, chunk: str) -> None:
+        # Drop input that has already been turned into nodes
+        self.body = self.body[self.pos :] + chunk
+        self.pos = 0
+        self.lexer(final=False)
+
+    def close(self) -> Element | Text:
+        self.lexer()
+        return self.finish()
+
+    def lexer(self, final: bool = True) -> None:
+        # Jumps between markup delimiters with str.find and regexes and hands
+        # slices of the body to add_text/add_tag. Anything that cannot be
+        # finished yet (text whose closing "<" has not arrived, a half-read
+        # tag) is left at self.pos for the next feed, unless this is final.
+        body: str = self.body
+        pos: int = self.pos
+        while pos < len(body):
+            if self.in_script:
+                end = body.find("</script", pos)
+                if end == -1:
+                    if not final:
+                        break
+                    end = len(body)
+                if end > pos:
+                    self.add_text(body[pos:end])
+                pos = end
+                self.in_script = False
+                continue
+
+            start = body.find("<", pos)
+            if start == -1:
+                if not final:
+                    break
+                self.add_text(body[pos:])
+                pos = len(body)
+                break
+            if start > pos:
+                self.add_text(body[pos:start])
+                pos = start
 
-        if not IN_TAG and text:
-            self.add_text(text)
+            if body.startswith("<!--", start):
+                end = body.find("-->", start + 4)
+                if end == -1:
+                    if not final:
+                        break
+                    # An unterminated comment runs to the end of the document
+                    end = len(body)
+                pos = end + 3
+                continue
+
+            match = TAG_CONTENTS.match(body, start + 1)
+            if not match:
+                if not final:
+                    break
+                # An unterminated tag is dropped
+                pos = len(body)
+                break
+            contents: str = match.group(1)
+            if '"' in contents or "'" in contents:
+                parts = [
+                    QUOTED.sub(r"\1\2", part) for part in TAG_PARTS.findall(contents)
+                ]
+            else:
+                parts = contents.split()
+            tag, *attributes = parts or [""]
+            self.add_tag(tag, attributes)
+            if tag == "script":
+                self.in_script = True
+            pos = match.end()
+        self.pos = min(pos, len(body))
 
     def add_text(self, text: str) -> None:
         if text.isspace():
@@ -211,7 +317,7 @@ class HTMLParser:
                 return
             # Close tags finish the last unfinished node by adding
             # it to the previous unfinished node
-            node: Element = self.unfinished.pop()
+            node: Element = self.pop()
             parent: Optional[Element] = self.unfinished[-1]
             if parent:
                 parent.children.append(node)
@@ -225,7 +331,7 @@ class HTMLParser:
             else:
                 parent = self.unfinished[-1] if self.unfinished else None
                 node = Element(tag=tag, attributes=attrs_dict, parent=parent)
-                self.unfinished.append(node)
+                self.push(node)
 
     # TODO: clean this up, handle <li> tags
     def handle_nested_tags(self, tag, attributes) -> None:
@@ -234,15 +340,15 @@ class HTMLParser:
 
         # If <p> is nested within another <p> tag, finish the first tag and create another
         if parent and parent.tag in SIBLING_TAGS and parent.tag == tag:
-            parent_p_tag: Element = self.unfinished.pop()
+            parent_p_tag: Element = self.pop()
             parent = self.unfinished[-1]
             if parent:
                 parent.children.append(parent_p_tag)
                 parent = parent_p_tag
         # If the parent tag isn't the same, look for parent p tag in the descendents
-        elif any(item.tag == "p" for item in self.unfinished):
+        elif self.open_tag_counts.get("p"):
             while self.unfinished:
-                last_node = self.unfinished.pop()
+                last_node = self.pop()
                 if last_node.tag == "p":
                     break
                 tags_to_finish.append(last_node)
@@ -255,20 +361,18 @@ class HTMLParser:
             # Parent tag is finished, so append it to the last unfinished node
             self.unfinished[-1].children.append(last_node)
         node = Element(tag=tag, attributes=attributes, parent=parent)
-        self.unfinished.append(node)
+        self.push(node)
         for item in tags_to_finish:
-            self.unfinished.append(
-                Element(tag=item.tag, attributes=attributes, parent=node)
-            )
+            self.push(Element(tag=item.tag, attributes=attributes, parent=node))
 
     def finish(self) -> Element | Text:
         if not self.unfinished:
             self.implicit_tags(None)
         while len(self.unfinished) > 1:
-            node: Element | Text = self.unfinished.pop()
+            node: Element | Text = self.pop()
             parent = self.unfinished[-1]
             parent.children.append(node)
-        return self.unfinished.pop()
+        return self.pop()
 
 
 class ViewSourceHTMLParser(HTMLParser):
@@ -276,31 +380,43 @@ class ViewSourceHTMLParser(HTMLParser):
     # We add a <b> tag before parsing actual text, and treat other
     # tags as if they were text, not tags.
 
-    def lexer(self) -> None:
-        IN_TAG, IN_TEXT = False, False
-        buffer: str = ""
+    def __init__(self, body: str = "") -> None:
+        super().__init__(body)
+        self.in_tag: bool = False
+        self.in_text: bool = False
+        self.buffer: str = ""
+
+    def feed(self, chunk: str) -> None:
+        # This lexer never looks around the current character, so each
+        # chunk can be lexed on its own
+        self.body = chunk
+        self.pos = 0
+        self.lexer(final=False)
 
-        for c in self.body:
+    def lexer(self, final: bool = True) -> None:
+        for c in self.body[self.pos :]:
             if c == "<":
-                IN_TAG = True
-                if IN_TEXT:
-                    self.add_text(buffer)
+                self.in_tag = True
+                if self.in_text:
+                    self.add_text(self.buffer)
                     self.add_tag("/b")
-                    IN_TEXT = False
-                    buffer = c
+                    self.in_text = False
+                    self.buffer = c
                 else:
-                    buffer += c
+                    self.buffer += c
             elif c == ">":
-                buffer += c
-                IN_TAG = False
-                if buffer:
-                    self.add_text(buffer)
-                    buffer = ""
+                self.buffer += c
+                self.in_tag = False
+                if self.buffer:
+                    self.add_text(self.buffer)
+                    self.buffer = ""
             else:
-                buffer += c
-                if not IN_TAG and not IN_TEXT and not c.isspace():
+                self.buffer += c
+                if not self.in_tag and not self.in_text and not c.isspace():
                     self.add_tag("b")
-                    IN_TEXT = True
+                    self.in_text = True
+        self.pos = len(self.body)
 
-        if buffer:
-            self.add_text(buffer)
+        if final and self.buffer:
+            self.add_text(self.buffer)
+            self.buffer = ""
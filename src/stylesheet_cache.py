@@ -0,0 +1,88 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from constants import STYLESHEET_CACHE_MAX_BYTES
+from css_parser import CSSParser, Selector
+
+DEFAULT_STYLE_SHEET_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "browser.css"
+)
+
+
+class StyleSheetCache:
+    # Parsed rules keyed by (url, content hash), so a sheet is only parsed
+    # again when its text changes. Rule lists are shared between pages and
+    # must not be mutated by callers.
+    def __init__(self, max_bytes: int = STYLESHEET_CACHE_MAX_BYTES) -> None:
+        self.max_bytes: int = max_bytes
+        # Entries as (rules, source length); the source length stands in for
+        # the memory the parsed rules take up
+        self.entries: OrderedDict[Tuple[str, str], Tuple[list, int]] = OrderedDict()
+        self.size: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.default: Optional[list[Tuple[Selector, dict]]] = None
+        self.lock = threading.Lock()
+
+    def parse(self, url: str, text: str) -> list[Tuple[Selector, dict]]:
+        key = (url, hashlib.sha256(text.encode("utf8")).hexdigest())
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        # Parse outside the lock so loads on other threads aren't held up
+        rules = CSSParser(text).parse()
+        with self.lock:
+            self._insert(key, rules, len(text))
+        return rules
+
+    def default_style_sheet(self) -> list[Tuple[Selector, dict]]:
+        # The browser's own sheet never changes while running, so it is read
+        # and parsed once and kept outside the LRU
+        if self.default is None:
+            with open(DEFAULT_STYLE_SHEET_PATH) as f:
+                rules = CSSParser(f.read()).parse()
+            with self.lock:
+                if self.default is None:
+                    self.default = rules
+        return self.default
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries = OrderedDict()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.size,
+        }
+
+    def _insert(self, key: Tuple[str, str], rules: list, size: int) -> None:
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.size -= previous[1]
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (rules, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+
+STYLESHEET_CACHE = StyleSheetCache()
@@ -0,0 +1,39 @@
+import concurrent.futures
+from typing import Optional
+
+from constants import MAX_SUBRESOURCE_FETCHES, SUBRESOURCE_TIMEOUT
+from network_loader import LoadHandle
+from url import URL
+
+SUBRESOURCE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=MAX_SUBRESOURCE_FETCHES, thread_name_prefix="subresource"
+)
+
+
+def fetch_subresources(
+    urls: list[URL],
+    timeout: float = SUBRESOURCE_TIMEOUT,
+    handle: Optional[LoadHandle] = None,
+) -> list[Optional[str]]:
+    # Fetches all urls concurrently and returns their bodies in the same
+    # order, with None for any fetch that failed or missed the deadline.
+    # Fetches belong to handle's page load: they stop when it is cancelled
+    # and don't outlive its deadline
+    if handle:
+        if handle.cancelled or handle.expired:
+            return [None] * len(urls)
+        timeout = min(timeout, handle.remaining())
+    futures = [
+        SUBRESOURCE_EXECUTOR.submit(url.request, timeout, handle) for url in urls
+    ]
+    concurrent.futures.wait(futures, timeout=timeout)
+    bodies: list[Optional[str]] = []
+    for future in futures:
+        if not future.done():
+            future.cancel()
+            bodies.append(None)
+        elif future.exception() is not None:
+            bodies.append(None)
+        else:
+            bodies.append(future.result())
+    return bodies
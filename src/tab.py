@@ -1,17 +1,36 @@
-import os
-import tkinter
+import traceback
 from parser import Element, HTMLParser, Text, ViewSourceHTMLParser
+from typing import Callable, Optional
 
 from constants import HEIGHT, SCROLL_STEP, SCROLLBAR_WIDTH, VSTEP, WIDTH
-from css_parser import CSSParser, style
+from canvas_layer import CanvasLayer
+from css_parser import RuleIndex, restyle
+from display_index import DisplayListIndex
 from document_layout import DocumentLayout
 from helpers import cascade_priority, paint_tree, tree_to_list
-from typedclasses import ScrollbarCoordinate
+from hit_test import HitTestIndex
+from network_loader import LoadHandle, NetworkLoader
+from stylesheet_cache import STYLESHEET_CACHE
+from subresources import fetch_subresources
+from typedclasses import PageLoad, ScrollbarCoordinate
 from url import URL
 
 
 class Tab:
-    def __init__(self, tab_height: int, screen_height=HEIGHT, screen_width=WIDTH):
+    def __init__(
+        self,
+        tab_height: int,
+        screen_height=HEIGHT,
+        screen_width=WIDTH,
+        loader: Optional[NetworkLoader] = None,
+        on_load: Optional[Callable[["Tab"], None]] = None,
+    ):
+        # Without a loader, pages load synchronously on the calling thread
+        self.loader = loader
+        self.on_load = on_load
+        self.pending_load: Optional[LoadHandle] = None
+        self.loading = False
+        self.nodes: Optional[Element | Text] = None
         self.scroll = 0
         self.screen_height = screen_height
         self.screen_width = screen_width
@@ -20,15 +39,17 @@ class Tab:
         self.tab_height = tab_height
         self.history: list = []
         self.display_list: list = []
+        self.display_index = DisplayListIndex(self.display_list)
+        self.hit_index: Optional[HitTestIndex] = None
         self.focus = None
 
     def _get_page_height(self) -> int:
         return self.tab_height
 
-    def get_stylesheet_links(self) -> list:
+    def get_stylesheet_links(self, nodes: Element | Text) -> list:
         return [
             node.attributes["href"]
-            for node in tree_to_list(self.nodes, [])
+            for node in tree_to_list(nodes, [])
             if isinstance(node, Element)
             and node.tag == "link"
             and node.attributes
@@ -36,39 +57,99 @@ class Tab:
             and "href" in node.attributes
         ]
 
-    def load_style_sheet(self) -> CSSParser:
-        dir_path = os.path.dirname(os.path.realpath(__file__))
-        return CSSParser(open(os.path.join(dir_path, "browser.css")).read()).parse()
+    def load_style_sheet(self) -> list:
+        return STYLESHEET_CACHE.default_style_sheet()
 
     def load(self, url: URL) -> None:
+        self.cancel_load()
         self.history.append(url)
         self.url = url
-        body: str | None = url.request()
-        if not body:
+        if self.loader is None:
+            self.finish_load(self.fetch(url))
             return
-        self.nodes: Element | Text
-        if url.view_source:
-            self.nodes = ViewSourceHTMLParser(body).parse()
-        else:
-            self.nodes = HTMLParser(body).parse()
-        self.rules: list = self.load_style_sheet().copy()
-        links: list = self.get_stylesheet_links()
-        for link in links:
-            style_url: URL = url.resolve(link)
-            try:
-                body = style_url.request()
-            except Exception:
+        self.loading = True
+        self.pending_load = self.loader.submit(
+            lambda handle: self.fetch(url, handle), self.finish_load, self.fail_load
+        )
+
+    def cancel_load(self) -> None:
+        if self.pending_load:
+            self.pending_load.cancel()
+            self.pending_load = None
+        self.loading = False
+
+    def fetch(self, url: URL, handle: Optional[LoadHandle] = None) -> PageLoad | None:
+        # Runs on a loader thread, so it must not touch Tk or this tab's
+        # rendered state; finish_load applies the result. The tree is built
+        # while the body downloads instead of after the whole response
+        if handle is None:
+            handle = LoadHandle()
+        parser: HTMLParser = ViewSourceHTMLParser() if url.view_source else HTMLParser()
+        received: bool = False
+        try:
+            for chunk in url.stream(handle.remaining(), handle):
+                if handle.cancelled:
+                    return None
+                if handle.expired:
+                    raise TimeoutError(f"loading {url} timed out")
+                parser.feed(chunk)
+                received = True
+        except (OSError, ValueError):
+            # Cancelling aborts the socket, which surfaces as a read error
+            if handle.cancelled:
+                return None
+            raise
+        if not received:
+            return None
+        nodes: Element | Text = parser.close()
+        rules: list = self.load_style_sheet().copy()
+        links: list = self.get_stylesheet_links(nodes)
+        style_urls: list[URL] = [url.resolve(link) for link in links]
+        if handle.cancelled:
+            return None
+        # Bodies come back in document order, so the cascade order is kept
+        style_bodies = fetch_subresources(style_urls, handle=handle)
+        if handle.cancelled:
+            return None
+        for style_url, style_body in zip(style_urls, style_bodies):
+            if style_body is None:
                 continue
-            assert body is not None
-            self.rules.extend(CSSParser(body).parse())
-        self.render()
+            rules.extend(STYLESHEET_CACHE.parse(str(style_url), style_body))
+        return PageLoad(nodes, rules)
+
+    def finish_load(self, page: PageLoad | None) -> None:
+        self.loading = False
+        self.pending_load = None
+        if page:
+            self.nodes = page.nodes
+            # Sorted and indexed once per page rather than on every render
+            self.rules: list = sorted(page.rules, key=cascade_priority)
+            self.rule_index = RuleIndex(self.rules)
+            self.document = DocumentLayout(node=self.nodes, width=self.screen_width)
+            self.render()
+        if self.on_load:
+            self.on_load(self)
+
+    def fail_load(self, e: Exception) -> None:
+        traceback.print_exception(e)
+        self.finish_load(None)
 
     def render(self):
-        style(self.nodes, sorted(self.rules, key=cascade_priority))
-        self.document = DocumentLayout(node=self.nodes)
+        assert self.nodes is not None
+        restyle(self.nodes, self.rule_index)
         self.document.layout()
         self.display_list: list = []
         paint_tree(self.document, self.display_list)
+        self.display_index = DisplayListIndex(self.display_list)
+        self.hit_index = HitTestIndex(self.document)
+
+    def resize(self, width: int, height: int) -> None:
+        self.screen_width = width
+        self.tab_height = height
+        if self.nodes is None:
+            return
+        self.document.page_width = width
+        self.render()
 
     def get_scrollbar_coordinates(self) -> ScrollbarCoordinate:
         page_height = self._get_page_height()
@@ -79,12 +160,11 @@ class Tab:
         y1 = y0 + scrollbar_height
         return ScrollbarCoordinate(x0, y0, x1, y1)
 
-    def draw_scrollbar(self, canvas) -> None:
-        if not self.display_list:
-            return
-        if self._get_page_height() <= self.screen_height:
+    def draw_scrollbar(self, canvas) -> bool:
+        # Returns whether a new scrollbar item was created on top of the canvas
+        if not self.display_list or self._get_page_height() <= self.screen_height:
             canvas.delete("scrollbar")
-            return
+            return False
         coords = self.get_scrollbar_coordinates()
         if canvas.gettags("scrollbar"):
             canvas.coords(
@@ -103,15 +183,14 @@ class Tab:
                 fill="blue",
                 tags="scrollbar",
             )
+            return True
+        return False
 
-    def draw(self, canvas: tkinter.Canvas, offset: int):
-        for cmd in self.display_list:
-            if cmd.rect.top > self.scroll + self.tab_height:
-                continue
-            if cmd.rect.bottom < self.scroll:
-                continue
-            cmd.execute(self.scroll - offset, canvas)
-        self.draw_scrollbar(canvas)
+    def draw(self, layer: CanvasLayer, offset: int) -> bool:
+        # Returns whether stacking changed, so the chrome needs raising again
+        visible = self.display_index.query(self.scroll, self.scroll + self.tab_height)
+        restacked = layer.update(visible, self.scroll - offset)
+        return self.draw_scrollbar(layer.canvas) or restacked
 
     def scrolldown(self) -> None:
         if not self.display_list:
@@ -134,17 +213,12 @@ class Tab:
         y += (
             self.scroll
         )  # Click handling goes from screen coordinates to page coordinates
-        objs = [
-            obj
-            for obj in tree_to_list(self.document, [])
-            if obj.x
-            and obj.y
-            and obj.x <= x < obj.x + obj.width
-            and obj.y <= y < obj.y + obj.height
-        ]
-        if not objs:
+        if self.hit_index is None:
+            return
+        obj = self.hit_index.hit(x, y)
+        if obj is None:
             return
-        elt: Element | Text = objs[-1].node
+        elt: Element | Text = obj.node
         while elt:
             if isinstance(elt, Text):
                 pass
@@ -152,7 +226,7 @@ class Tab:
                 url = self.url.resolve(elt.attributes["href"])
                 return self.load(url)
             elif elt.tag == "input":
-                elt.attributes["value"] = ""
+                elt.set_attribute("value", "")
                 return self.render()
             elt = elt.parent
 
@@ -20,6 +20,10 @@ class socket:
     def __init__(self, *args, **kwargs):
         self.request = b""
         self.connected = False
+        self.responded = False
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
 
     def connect(self, host_port):
         self.scheme = "http"
@@ -27,6 +31,10 @@ class socket:
         self.connected = True
 
     def send(self, text):
+        # A kept-alive socket starts a new request once the last one was answered
+        if self.responded:
+            self.request = b""
+            self.responded = False
         self.request += text
         self.method, self.path, _ = self.request.decode("latin1").split(" ", 2)
 
@@ -49,6 +57,7 @@ class socket:
         else:
             url = self.scheme + "://" + self.host + ":" + str(self.port) + self.path
         self.Requests.setdefault(url, []).append(self.request)
+        self.responded = True
         assert (
             self.method == self.URLs[url][0]
         ), f"Made a {self.method} request to a {self.URLs[url][0]} URL"
@@ -60,7 +69,7 @@ class socket:
             stream = io.TextIOWrapper(stream, encoding=encoding, newline=newline)
             stream.mode = mode
         else:
-            assert mode == "b", "If no file encoding is passed, must pass 'b' mode"
+            assert "b" in mode, "If no file encoding is passed, must pass 'b' mode"
 
         return stream
 
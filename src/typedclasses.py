@@ -1,5 +1,7 @@
-import tkinter.font
 from dataclasses import dataclass
+from parser import Element, Text
+
+from font_cache import CachedFont
 
 
 @dataclass
@@ -15,12 +17,25 @@ class DisplayListItem:
     x: int
     y: int
     text: str
-    font: tkinter.font.Font
+    font: CachedFont
 
 
 @dataclass
 class LineItem:
     x: int
     text: str
-    font: tkinter.font.Font
+    font: CachedFont
     color: str
+
+
+@dataclass
+class HTTPResponse:
+    status: int
+    headers: dict[str, str]
+    body: str
+
+
+@dataclass
+class PageLoad:
+    nodes: Element | Text
+    rules: list
@@ -1,7 +1,12 @@
-import socket
-import ssl
+import codecs
+import zlib
+from typing import Generator, Iterator, Optional
 
-from constants import PORTS
+from connection_pool import CONNECTION_POOL
+from constants import DEFAULT_CHARSET, NO_BODY_STATUSES, PORTS, STREAM_BLOCK_SIZE
+from http_cache import HTTP_CACHE
+from network_loader import LoadHandle
+from typedclasses import HTTPResponse
 
 
 class URL:
@@ -48,9 +53,11 @@ class URL:
         req += f"{header}: {val}\r\n"
         return req
 
-    def request(self):
+    def request(
+        self, timeout: Optional[float] = None, handle: Optional[LoadHandle] = None
+    ):
         if self.scheme in ["http", "https", "view-source"]:
-            return self._request_http()
+            return self._request_http(timeout, handle)
 
         if self.scheme == "data":
             return self._request_data()
@@ -61,6 +68,19 @@ class URL:
         if self.scheme == "about":
             return self._request_about_blank()
 
+    def stream(
+        self, timeout: Optional[float] = None, handle: Optional[LoadHandle] = None
+    ) -> Iterator[str]:
+        # Yields the body in decoded pieces as they arrive, so callers can
+        # start working before the whole response is downloaded. Sockets are
+        # attached to handle, so cancelling it aborts a blocked read
+        if self.scheme in ["http", "https", "view-source"]:
+            yield from self._stream_http(timeout, handle)
+            return
+        body = self.request(timeout)
+        if body:
+            yield body
+
     def _request_file(self) -> str:
         with open(self.path, encoding="utf-8") as f:
             return f.read()
@@ -72,38 +92,158 @@ class URL:
     def _request_about_blank(self) -> None:
         return None
 
-    def _request_http(self) -> str:
-        s = (
-            socket.socket()
-        )  # defaults: addr family AF_INET, type SOCKET_STREAM, protocol IPPROTO_TCP
-        s.connect((self.host, self.port))
+    def _request_http(
+        self, timeout: Optional[float] = None, handle: Optional[LoadHandle] = None
+    ) -> str:
+        return "".join(self._stream_http(timeout, handle))
 
-        if self.scheme == "https":
-            ctx = ssl.create_default_context()
-            s = ctx.wrap_socket(s, server_hostname=self.host)
+    def _stream_http(
+        self, timeout: Optional[float] = None, handle: Optional[LoadHandle] = None
+    ) -> Iterator[str]:
+        cache_key = str(self)
+        entry, fresh = HTTP_CACHE.lookup(cache_key)
+        if entry and fresh:
+            yield entry.body
+            return
 
+        status, response_headers, body = self._fetch_http(
+            entry.validators() if entry else {}, timeout, handle
+        )
+        if status == 304 and entry:
+            # Drain the empty body so the connection goes back to the pool
+            for _ in body:
+                pass
+            yield HTTP_CACHE.revalidated(cache_key, entry, response_headers).body
+            return
+
+        if not HTTP_CACHE.is_storable(HTTPResponse(status, response_headers, "")):
+            HTTP_CACHE.remove(cache_key)
+            yield from body
+            return
+        # Storable bodies are collected for the cache while they stream
+        chunks: list[str] = []
+        for chunk in body:
+            chunks.append(chunk)
+            yield chunk
+        HTTP_CACHE.store(
+            cache_key, HTTPResponse(status, response_headers, "".join(chunks))
+        )
+
+    def _fetch_http(
+        self,
+        request_headers: dict[str, str],
+        timeout: Optional[float] = None,
+        handle: Optional[LoadHandle] = None,
+    ) -> tuple[int, dict[str, str], Generator[str, None, None]]:
+        assert self.port is not None
+        s, reused = CONNECTION_POOL.acquire(self.scheme, self.host, self.port, timeout)
+        if handle:
+            handle.attach(s)
+        try:
+            version, status, response_headers, response = self._send_request(
+                s, request_headers
+            )
+        except (OSError, ValueError):
+            s.close()
+            if handle:
+                handle.detach(s)
+            if not reused or (handle and handle.cancelled):
+                raise
+            # The server may have dropped an idle connection; retry once on
+            # a fresh one
+            s = CONNECTION_POOL.connect(self.scheme, self.host, self.port, timeout)
+            if handle:
+                handle.attach(s)
+            version, status, response_headers, response = self._send_request(
+                s, request_headers
+            )
+        body = self._read_body(s, response, version, status, response_headers, handle)
+        return status, response_headers, body
+
+    def _send_request(self, s, request_headers: dict[str, str]) -> tuple:
         req = f"GET {self.path} HTTP/1.1\r\n"
         req = self.append_header(req, "Host", self.host)
-        req = self.append_header(req, "Connection", "close")
+        req = self.append_header(req, "Connection", "keep-alive")
         req = self.append_header(req, "User-Agent", "Margot's Browser")
+        req = self.append_header(req, "Accept-Encoding", "gzip, deflate")
+        for header, value in request_headers.items():
+            req = self.append_header(req, header, value)
         req += "\r\n"
         s.send(req.encode("utf8"))  # convert to bytes
 
-        response = s.makefile("r", encoding="utf8", newline="\r\n")
-        statusline = response.readline()
+        response = s.makefile("rb")
+        statusline = response.readline().decode("latin1")
+        if not statusline:
+            raise ValueError("connection closed before response")
         version, status, explanation = statusline.split(" ", 2)
 
         response_headers = {}
         while True:
-            line = response.readline()
-            if line == "\r\n":
+            line = response.readline().decode("latin1")
+            if line in ["\r\n", "\n", ""]:
                 break
             header, value = line.split(":", 1)
             response_headers[header.casefold()] = value.strip()
+        return version, int(status), response_headers, response
+
+    def _read_body(
+        self,
+        s,
+        response,
+        version: str,
+        status: int,
+        response_headers: dict,
+        handle: Optional[LoadHandle] = None,
+    ) -> Generator[str, None, None]:
+        framed = True
+        raw_chunks: Iterator[bytes]
+        if status in NO_BODY_STATUSES:
+            raw_chunks = iter([])
+        elif "chunked" in response_headers.get("transfer-encoding", "").casefold():
+            raw_chunks = read_chunked(response)
+        elif "content-length" in response_headers:
+            raw_chunks = read_length(response, int(response_headers["content-length"]))
+        else:
+            # Without a length the body runs until the server closes
+            raw_chunks = read_until_close(response)
+            framed = False
+
+        content_decoder = ContentDecoder(
+            response_headers.get("content-encoding", "identity")
+        )
+        text_decoder = codecs.getincrementaldecoder(
+            get_charset(response_headers.get("content-type", ""))
+        )(errors="replace")
+        finished = False
+        try:
+            for raw in raw_chunks:
+                text = text_decoder.decode(content_decoder.decompress(raw))
+                if text:
+                    yield text
+            text = text_decoder.decode(content_decoder.flush(), final=True)
+            if text:
+                yield text
+            finished = True
+        finally:
+            # A body abandoned half way leaves the connection unusable
+            response.close()
+            usable = handle.detach(s) if handle else True
+            if (
+                usable
+                and finished
+                and framed
+                and self._keep_alive(version, response_headers)
+            ):
+                assert self.port is not None
+                CONNECTION_POOL.release(self.scheme, self.host, self.port, s)
+            else:
+                s.close()
 
-        content = response.read()
-        s.close()
-        return content
+    def _keep_alive(self, version: str, response_headers: dict) -> bool:
+        connection = response_headers.get("connection", "").casefold()
+        if version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
 
     def resolve(self, url: str):
         if "://" in url:
@@ -119,3 +259,96 @@ class URL:
             return URL(f"{self.scheme}:{url}")
         else:
             return URL(f"{self.scheme}://{self.host}:{str(self.port)}{url}")
+
+
+def read_chunked(response) -> Iterator[bytes]:
+    while True:
+        size_line = response.readline().decode("latin1")
+        if not size_line:
+            raise ValueError("connection closed inside chunked body")
+        # Chunk extensions after ";" carry nothing we use
+        size = int(size_line.split(";", 1)[0].strip(), 16)
+        if size == 0:
+            break
+        yield from read_length(response, size)
+        response.readline()  # CRLF after each chunk
+    # Skip any trailer headers up to the blank line that ends the body
+    while response.readline() not in [b"\r\n", b"\n", b""]:
+        pass
+
+
+def read_length(response, length: int) -> Iterator[bytes]:
+    while length > 0:
+        block = response.read1(min(length, STREAM_BLOCK_SIZE))
+        if not block:
+            raise ValueError("connection closed before end of body")
+        length -= len(block)
+        yield block
+
+
+def read_until_close(response) -> Iterator[bytes]:
+    while True:
+        block = response.read1(STREAM_BLOCK_SIZE)
+        if not block:
+            break
+        yield block
+
+
+class ContentDecoder:
+    # Undoes Content-Encoding incrementally; encodings are listed in the
+    # order they were applied, so they are undone last to first
+    def __init__(self, content_encoding: str) -> None:
+        self.encodings: list[str] = [
+            encoding.strip()
+            for encoding in reversed(content_encoding.casefold().split(","))
+            if encoding.strip() in ["gzip", "x-gzip", "deflate"]
+        ]
+        self.decompressors: list = [None] * len(self.encodings)
+
+    def _decompressor(self, i: int, data: bytes):
+        if self.decompressors[i] is None:
+            if self.encodings[i] == "deflate" and not _has_zlib_header(data):
+                # Some servers send raw deflate data without the zlib header
+                wbits = -zlib.MAX_WBITS
+            elif self.encodings[i] == "deflate":
+                wbits = zlib.MAX_WBITS
+            else:
+                wbits = 16 + zlib.MAX_WBITS
+            self.decompressors[i] = zlib.decompressobj(wbits)
+        return self.decompressors[i]
+
+    def decompress(self, data: bytes) -> bytes:
+        for i in range(len(self.encodings)):
+            if not data and self.decompressors[i] is None:
+                break
+            data = self._decompressor(i, data).decompress(data)
+        return data
+
+    def flush(self) -> bytes:
+        data = b""
+        for i in range(len(self.encodings)):
+            if not data and self.decompressors[i] is None:
+                break
+            decompressor = self._decompressor(i, data)
+            data = decompressor.decompress(data) + decompressor.flush()
+        return data
+
+
+def _has_zlib_header(data: bytes) -> bool:
+    return (
+        len(data) >= 2 and data[0] & 0x0F == 8 and (data[0] * 256 + data[1]) % 31 == 0
+    )
+
+
+def get_charset(content_type: str) -> str:
+    for param in content_type.split(";")[1:]:
+        if "=" not in param:
+            continue
+        name, value = param.split("=", 1)
+        if name.strip().casefold() == "charset":
+            charset = value.strip().strip('"')
+            try:
+                return codecs.lookup(charset).name
+            except LookupError:
+                break
+    return DEFAULT_CHARSET
@@ -0,0 +1,15 @@
+import pytest
+
+
+@pytest.fixture
+def fixed_metrics():
+    # Measures text with the built-in advance tables, then puts back
+    # whichever backend was in use before. Imported here because src only
+    # lands on sys.path once pytest has collected src/test_utils.py
+    import font_cache
+    from font_metrics import FixedMetricsFontBackend
+
+    previous = font_cache.FONT_BACKEND
+    font_cache.set_font_backend(FixedMetricsFontBackend())
+    yield
+    font_cache.set_font_backend(previous)
@@ -0,0 +1,153 @@
+from canvas_layer import CanvasLayer
+from draw import DrawLine, DrawRect, DrawText, Rect
+from font_metrics import FixedMetricsFont
+
+FONT = FixedMetricsFont(12, "normal", "roman", "Times")
+
+
+class FakeCanvas:
+    # Records items and their stacking order, bottom first
+    def __init__(self):
+        self.items: dict[int, dict] = {}
+        self.stack: list[int] = []
+        self.next_id = 1
+        self.moves = 0
+
+    def _create(self, kind, *coords, tags=(), **options):
+        item = self.next_id
+        self.next_id += 1
+        if isinstance(tags, str):
+            tags = (tags,)
+        self.items[item] = {"kind": kind, "coords": list(coords), "tags": tags}
+        self.stack.append(item)
+        return item
+
+    def create_text(self, *args, **kwargs):
+        return self._create("text", *args, **kwargs)
+
+    def create_rectangle(self, *args, **kwargs):
+        return self._create("rectangle", *args, **kwargs)
+
+    def create_line(self, *args, **kwargs):
+        return self._create("line", *args, **kwargs)
+
+    def _find(self, tag_or_id):
+        if isinstance(tag_or_id, int):
+            return [tag_or_id] if tag_or_id in self.items else []
+        return [i for i in self.stack if tag_or_id in self.items[i]["tags"]]
+
+    def delete(self, *tags_or_ids):
+        for tag_or_id in tags_or_ids:
+            for item in self._find(tag_or_id):
+                del self.items[item]
+                self.stack.remove(item)
+
+    def move(self, tag_or_id, dx, dy):
+        self.moves += 1
+        for item in self._find(tag_or_id):
+            coords = self.items[item]["coords"]
+            for i in range(1, len(coords), 2):
+                coords[i] += dy
+
+    def tag_raise(self, tag_or_id, above=None):
+        items = self._find(tag_or_id)
+        for item in items:
+            self.stack.remove(item)
+        index = len(self.stack)
+        if above is not None:
+            index = self.stack.index(self._find(above)[-1]) + 1
+        self.stack[index:index] = items
+
+    def tag_lower(self, tag_or_id, below):
+        items = self._find(tag_or_id)
+        for item in items:
+            self.stack.remove(item)
+        index = self.stack.index(self._find(below)[0])
+        self.stack[index:index] = items
+
+    def painted(self) -> list:
+        return [
+            self.items[i]["coords"][:2] + [self.items[i]["kind"]] for i in self.stack
+        ]
+
+
+def page(*tops: int) -> list:
+    return [DrawText(10, top, f"word{top}", FONT, "black") for top in tops]
+
+
+def painted(commands: list, scroll: float) -> list:
+    # What a fresh canvas shows after drawing commands at scroll
+    canvas = FakeCanvas()
+    for cmd in commands:
+        cmd.execute(scroll, canvas)
+    return canvas.painted()
+
+
+class TestCanvasLayer:
+    def test_unchanged_redraw_creates_nothing(self):
+        canvas = FakeCanvas()
+        layer = CanvasLayer(canvas, "content")
+        commands = page(0, 20, 40)
+        assert layer.update(commands, 0)
+        assert not layer.update(page(0, 20, 40), 0)
+        assert layer.stats() == {"items": 3, "created": 3, "deleted": 0, "moved": 0}
+        assert canvas.painted() == painted(commands, 0)
+
+    def test_scrolling_moves_existing_items(self):
+        canvas = FakeCanvas()
+        layer = CanvasLayer(canvas, "content")
+        layer.update(page(0, 20, 40, 60), 0)
+        layer.update(page(20, 40, 60, 80), 20)
+        assert layer.stats() == {"items": 4, "created": 5, "deleted": 1, "moved": 1}
+        assert canvas.moves == 1
+        assert canvas.painted() == painted(page(20, 40, 60, 80), 20)
+
+    def test_scrolling_back_reuses_moved_items(self):
+        canvas = FakeCanvas()
+        layer = CanvasLayer(canvas, "content")
+        commands = page(0, 20, 40, 60, 80)
+        layer.update(commands[:3], 0)
+        layer.update(commands[1:4], 20)
+        layer.update(commands[2:], 40)
+        layer.update(commands[1:4], 20)
+        assert layer.stats()["created"] == 6
+        assert canvas.painted() == painted(commands[1:4], 20)
+
+    def test_only_changed_commands_are_replaced(self):
+        canvas = FakeCanvas()
+        layer = CanvasLayer(canvas, "content")
+        layer.update(page(0, 20, 40), 0)
+        changed = page(0, 20, 40)
+        changed[1] = DrawText(10, 20, "edited", FONT, "black")
+        layer.update(changed, 0)
+        assert layer.stats()["created"] == 4
+        assert layer.stats()["deleted"] == 1
+        assert canvas.painted() == painted(changed, 0)
+
+    def test_new_items_keep_paint_order(self):
+        canvas = FakeCanvas()
+        layer = CanvasLayer(canvas, "content")
+        text = page(0, 20)
+        layer.update(text, 0)
+        background = DrawRect(Rect(0, 0, 100, 100), "gray")
+        underline = DrawLine(0, 10, 50, 10, "black", 1)
+        commands = [background, text[0], underline, text[1]]
+        assert layer.update(commands, 0)
+        assert canvas.painted() == painted(commands, 0)
+
+    def test_reordered_items_are_restacked(self):
+        canvas = FakeCanvas()
+        layer = CanvasLayer(canvas, "content")
+        commands = [DrawRect(Rect(0, 0, 10, 10), "red")] + page(0)
+        layer.update(commands, 0)
+        assert layer.update(commands[::-1], 0)
+        assert layer.stats()["created"] == 2
+        assert canvas.painted() == painted(commands[::-1], 0)
+
+    def test_items_are_tagged_with_layer(self):
+        canvas = FakeCanvas()
+        layer = CanvasLayer(canvas, "chrome")
+        layer.update(page(0) + [DrawRect(Rect(0, 0, 10, 10), "red")], 0)
+        assert all("chrome" in item["tags"] for item in canvas.items.values())
+        layer.clear()
+        assert canvas.items == {}
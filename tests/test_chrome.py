@@ -0,0 +1,66 @@
+import pytest
+from chrome import Chrome
+from draw import Rect
+from url import URL
+
+
+class StubTab:
+    def __init__(self):
+        self.url = URL("http://example.org/")
+        self.loading = False
+
+
+class StubBrowser:
+    def __init__(self):
+        self.screen_width = 800
+        self.tabs = [StubTab(), StubTab()]
+        self.active_tab = self.tabs[0]
+        self.damage: list[Rect] = []
+
+    def invalidate(self, rect):
+        self.damage.append(rect)
+
+
+class TestChromeDamage:
+    @pytest.fixture(autouse=True)
+    def chrome(self, fixed_metrics):
+        self.browser = StubBrowser()
+        self.chrome = Chrome(self.browser)
+
+    def test_typing_damages_only_the_address_bar(self):
+        self.chrome.click(
+            self.chrome.address_rect.left + 1, self.chrome.address_rect.top + 1
+        )
+        self.chrome.keypress("a")
+        self.chrome.backspace()
+        assert self.browser.damage == [self.chrome.address_rect] * 2
+
+    def test_keypress_without_focus_damages_nothing(self):
+        self.chrome.keypress("a")
+        assert self.browser.damage == []
+
+    def test_undamaged_components_reuse_commands(self):
+        first = self.chrome.paint()
+        self.chrome.focus = "address bar"
+        self.chrome.address_bar = "example"
+        second = self.chrome.paint([self.chrome.address_rect])
+        reused = [cmd for cmd in second if cmd in first]
+        tabs = self.chrome.tab_rect(0)
+        assert all(not cmd.rect.intersects(self.chrome.address_rect) for cmd in reused)
+        assert any(cmd.rect.intersects(tabs) for cmd in reused)
+        assert "example" in [getattr(cmd, "text", None) for cmd in second]
+
+    def test_damage_outside_chrome_repaints_nothing(self):
+        first = self.chrome.paint()
+        below = Rect(0, self.chrome.bottom, 800, 600)
+        assert self.chrome.paint([below]) == first
+        assert self.chrome.paint() != first
+
+
+class TestRect:
+    def test_intersects(self):
+        rect = Rect(0, 0, 10, 10)
+        assert rect.intersects(Rect(5, 5, 15, 15))
+        assert rect.intersects(Rect(2, 2, 3, 3))
+        assert not rect.intersects(Rect(10, 0, 20, 10))
+        assert not rect.intersects(Rect(0, 10, 10, 20))
@@ -0,0 +1,43 @@
+from connection_pool import ConnectionPool
+
+
+class FakeSocket:
+    def __init__(self):
+        self.closed = False
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool:
+    def test_evicts_least_recently_released_over_cap(self):
+        pool = ConnectionPool(max_idle=2)
+        sockets = [FakeSocket() for _ in range(3)]
+        for i, s in enumerate(sockets):
+            pool.release("http", f"host{i}", 80, s)
+        assert sockets[0].closed
+        assert not sockets[1].closed and not sockets[2].closed
+        assert pool.stats()["idle"] == 2
+
+    def test_evicts_expired_connections(self):
+        pool = ConnectionPool(idle_timeout=-1)
+        s = FakeSocket()
+        pool.release("http", "host", 80, s)
+        pool.connect = lambda scheme, host, port, timeout: FakeSocket()
+        reused_socket, reused = pool.acquire("http", "host", 80)
+        assert not reused
+        assert reused_socket is not s
+        assert s.closed
+        assert pool.stats() == {"hits": 0, "misses": 1, "idle": 0}
+
+    def test_reuses_idle_connection_for_same_origin(self):
+        pool = ConnectionPool()
+        s = FakeSocket()
+        pool.release("https", "host", 443, s)
+        reused_socket, reused = pool.acquire("https", "host", 443)
+        assert reused
+        assert reused_socket is s
+        assert pool.stats() == {"hits": 1, "misses": 0, "idle": 0}
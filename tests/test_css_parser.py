@@ -1,4 +1,18 @@
-from css_parser import CSSParser, ClassSelector, DescendantSelector, TagSelector
+import pytest
+from parser import HTMLParser
+
+from bloom_filter import CountingBloomFilter
+from css_parser import (
+    ClassSelector,
+    CSSParser,
+    DescendantSelector,
+    RuleIndex,
+    StyleSharingCache,
+    TagSelector,
+    restyle,
+    style,
+)
+from helpers import cascade_priority, tree_to_list
 
 
 class TestCSSParser:
@@ -41,3 +55,148 @@ class TestCSSParser:
         assert selector.tag == "p"
         assert isinstance(body, dict)
         assert body.get("color") == "blue"
+
+
+class TestStyle:
+    def styled(self, html: str, css: str):
+        tree = HTMLParser(html).parse()
+        style(tree, sorted(CSSParser(css).parse(), key=cascade_priority))
+        return tree
+
+    def test_indexed_rules_keep_cascade_order(self):
+        css = "p { color: red; } .x { color: blue; } div p { color: green; }"
+        tree = self.styled("<div><p class='x'>in</p></div><p class='x'>out</p>", css)
+        body = tree.children[0]
+        inside = body.children[0].children[0]
+        outside = body.children[1]
+        assert inside.style["color"] == "green"
+        assert outside.style["color"] == "red"
+
+    def test_rule_index_buckets_by_rightmost_selector(self):
+        rules = CSSParser(
+            "p { color: red; } .x { color: blue; } div a { color: green; }"
+        ).parse()
+        index = RuleIndex(rules)
+        assert set(index.by_tag) == {"p", "a"}
+        assert set(index.by_class) == {"x"}
+        assert index.universal == []
+
+    def test_nested_descendant_selectors_match_through_filter(self):
+        css = "section div p { color: green; } .outer b { color: red; }"
+        tree = self.styled(
+            "<section><div><p>in <b>x</b></p></div></section>"
+            "<div class='outer'><p><b>y</b></p></div><p>out</p>",
+            css,
+        )
+        body = tree.children[0]
+        section, outer, out = body.children
+        inner_p = section.children[0].children[0]
+        assert inner_p.style["color"] == "green"
+        assert inner_p.children[1].style["color"] == "green"
+        assert outer.children[0].children[0].style["color"] == "red"
+        assert out.style["color"] == "black"
+
+    def test_ancestor_filter_rejects_without_walking(self):
+        DescendantSelector.reset_stats()
+        html = "<div>" * 50 + "<p>deep</p>" + "</div>" * 50
+        tree = self.styled(html, "article p { color: red; }")
+        assert DescendantSelector.fast_rejects == 1
+        assert DescendantSelector.full_walks == 0
+        p = tree_to_list(tree, [])[-2]
+        assert p.style["color"] == "black"
+
+    def test_styling_a_subtree_sees_existing_ancestors(self):
+        tree = HTMLParser("<article><div><p>x</p></div></article>").parse()
+        rules = CSSParser("article p { color: red; }").parse()
+        style(tree, rules)
+        div = tree.children[0].children[0].children[0]
+        div.children[0].style = {}
+        style(div, rules)
+        assert div.children[0].style["color"] == "red"
+
+    def test_identical_siblings_share_one_style(self):
+        tree = self.styled(
+            "<ul><li>a</li><li>b</li><li class='x'>c</li></ul>", ".x { color: red; }"
+        )
+        first, second, third = tree.children[0].children[0].children
+        assert first.style is second.style
+        assert first.children[0].style is second.children[0].style
+        assert third.style is not first.style
+        assert third.style["color"] == "red"
+        with pytest.raises(TypeError):
+            first.style["color"] = "blue"  # type: ignore[index]
+
+    def test_cousins_with_different_ancestors_do_not_share(self):
+        tree = self.styled(
+            "<div><ul><li>a</li></ul></div><section><ul><li>b</li></ul></section>",
+            "div li { color: red; }",
+        )
+        div, section = tree.children[0].children
+        div_li = div.children[0].children[0]
+        section_li = section.children[0].children[0]
+        assert div_li.style["color"] == "red"
+        assert section_li.style["color"] == "black"
+
+    def test_sharing_cache_counts_hits(self):
+        tree = HTMLParser("<ul>" + "<li>item</li>" * 100 + "</ul>").parse()
+        shared = StyleSharingCache()
+        style(tree, [], shared=shared)
+        assert shared.stats()["hits"] == 198
+
+
+class TestRestyle:
+    def setup_method(self):
+        self.tree = HTMLParser(
+            "<div><p>one <b>two</b></p><p>three</p></div><section>four</section>"
+        ).parse()
+        self.rules = RuleIndex(
+            sorted(
+                CSSParser(".x p { color: red; } b { font-weight: bold; }").parse(),
+                key=cascade_priority,
+            )
+        )
+        restyle(self.tree, self.rules)
+        body = self.tree.children[0]
+        self.div, self.section = body.children
+
+    def restyled(self) -> int:
+        shared = StyleSharingCache()
+        restyle(self.tree, self.rules, shared=shared)
+        stats = shared.stats()
+        return stats["hits"] + stats["misses"]
+
+    def test_clean_tree_is_not_visited(self):
+        assert not any(node.style_dirty for node in tree_to_list(self.tree, []))
+        self.div.set_attribute("id", "main")
+        assert self.restyled() == 0
+
+    def test_class_change_restyles_subtree(self):
+        self.div.set_attribute("class", "x")
+        assert self.restyled() == 7
+        first, second = self.div.children
+        assert first.style["color"] == "red"
+        assert first.children[1].style["color"] == "red"
+        assert second.style["color"] == "red"
+        assert self.section.style["color"] == "black"
+
+    def test_changed_style_propagates_to_children(self):
+        self.section.set_attribute("style", "color: blue")
+        assert self.restyled() == 2
+        assert self.section.children[0].style["color"] == "blue"
+
+    def test_unchanged_style_stops_propagation(self):
+        self.div.set_attribute("style", "color: black")
+        assert self.restyled() == 1
+        assert self.div.children[0].style["color"] == "black"
+
+
+class TestCountingBloomFilter:
+    def test_add_and_remove(self):
+        ancestors = CountingBloomFilter()
+        ancestors.add(("tag", "div"))
+        ancestors.add(("tag", "div"))
+        assert ancestors.might_contain(("tag", "div"))
+        ancestors.remove(("tag", "div"))
+        assert ancestors.might_contain(("tag", "div"))
+        ancestors.remove(("tag", "div"))
+        assert not ancestors.might_contain(("tag", "div"))
@@ -0,0 +1,45 @@
+import random
+
+from display_index import DisplayListIndex
+from draw import DrawRect, Rect
+
+
+def rect_command(top: float, bottom: float) -> DrawRect:
+    return DrawRect(Rect(0, top, 10, bottom), "red")
+
+
+def visible(display_list: list, top: float, bottom: float) -> list:
+    return [
+        cmd
+        for cmd in display_list
+        if not (cmd.rect.top > bottom or cmd.rect.bottom < top)
+    ]
+
+
+class TestDisplayListIndex:
+    def test_query_matches_linear_scan(self):
+        rng = random.Random(0)
+        display_list = []
+        for _ in range(2000):
+            top = rng.uniform(0, 20000)
+            display_list.append(rect_command(top, top + rng.choice([15, 40, 3000])))
+        index = DisplayListIndex(display_list, tile_height=100)
+        for _ in range(200):
+            top = rng.uniform(-100, 20000)
+            bottom = top + rng.uniform(0, 900)
+            assert index.query(top, bottom) == visible(display_list, top, bottom)
+
+    def test_tall_command_is_returned_once(self):
+        background = rect_command(0, 1000)
+        word = rect_command(450, 470)
+        index = DisplayListIndex([background, word], tile_height=100)
+        assert index.query(300, 700) == [background, word]
+
+    def test_only_tiles_in_view_are_visited(self):
+        display_list = [rect_command(y, y + 10) for y in range(0, 100000, 20)]
+        index = DisplayListIndex(display_list, tile_height=100)
+        assert len(index.tiles) == 1000
+        assert len(index.query(5000, 5100)) == 6
+
+    def test_empty_display_list(self):
+        assert DisplayListIndex([]).query(0, 600) == []
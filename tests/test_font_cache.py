@@ -0,0 +1,105 @@
+import _tkinter
+
+from css_parser import style
+from document_layout import DocumentLayout
+from font_cache import FONTS, CachedFont, get_font, measure_stats
+from parser import HTMLParser
+from test_utils import TkFont
+
+
+class CountingFont(TkFont):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    def measure(self, word):
+        self.calls += 1
+        return super().measure(word)
+
+    def metrics(self, name=None):
+        self.calls += 1
+        return super().metrics(name)
+
+
+class TclFont(CountingFont):
+    # Backed by a real Tcl interpreter whose font command measures one unit
+    # per character, so batching goes through the same Tcl call as with Tk
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # tkinter.Tcl() goes through the patched tkinter.Tk, so the
+        # interpreter is created directly, without Tk
+        self._tk = _tkinter.create(None, "", "Tcl", False, True, False, False, None)
+        self._tk.eval("proc font {command name text} { string length $text }")
+        self.name = "font1"
+
+
+class TestCachedFont:
+    def test_repeated_measurements_hit_cache(self):
+        tk_font = CountingFont(size=10)
+        font = CachedFont(tk_font)
+        assert font.measure("word") == 40
+        assert font.measure("word") == 40
+        assert font.measure(" ") == 10
+        assert tk_font.calls == 2
+        assert font.hits == 1
+        assert font.misses == 2
+
+    def test_metrics_are_read_once(self):
+        tk_font = CountingFont(size=10)
+        font = CachedFont(tk_font)
+        assert font.metrics("ascent") == 7.5
+        assert font.metrics("descent") == 2.5
+        assert font.metrics()["linespace"] == 10
+        assert tk_font.calls == 1
+
+    def test_least_recently_used_width_is_dropped(self):
+        font = CachedFont(CountingFont(size=10), max_entries=2)
+        font.measure("a")
+        font.measure("b")
+        font.measure("a")
+        font.measure("c")
+        assert list(font.widths) == ["a", "c"]
+
+    def test_batch_is_measured_in_one_tcl_call(self):
+        tk_font = TclFont(size=10)
+        font = CachedFont(tk_font)
+        font.measure_many(["one", "three", "{brace", "one", "$x"])
+        assert font.tk_calls == 1
+        assert tk_font.calls == 0
+        assert font.measure("three") == 5
+        assert font.measure("{brace") == 6
+        assert font.measure("$x") == 2
+        assert font.tk_calls == 1
+
+    def test_batch_fill_is_counted_once(self):
+        font = CachedFont(TclFont(size=10))
+        font.measure_many(["one", "two", "one"])
+        assert font.misses == 2
+        font.measure("one")
+        font.measure("two")
+        assert font.hits == 0
+        font.measure("one")
+        assert font.hits == 1
+        assert font.misses == 2
+
+    def test_batch_without_tcl_falls_back_to_measure(self):
+        tk_font = CountingFont(size=10)
+        font = CachedFont(tk_font)
+        font.measure_many(["a", "b"])
+        font.measure_many(["a", "b"])
+        assert tk_font.calls == 2
+        assert font.measure("b") == 10
+
+    def test_attributes_come_from_tk_font(self):
+        font = get_font(12, "bold", "roman")
+        assert font.size == 12
+        assert font.weight == "bold"
+
+    def test_layout_measures_each_word_once(self):
+        FONTS.clear()
+        tree = HTMLParser("<p>" + "same words again " * 50 + "</p>").parse()
+        style(tree, [])
+        DocumentLayout(tree).layout()
+        stats = measure_stats()
+        assert stats["misses"] == 4
+        assert stats["hits"] > 300
@@ -0,0 +1,70 @@
+import pytest
+from css_parser import style
+from document_layout import DocumentLayout
+from font_cache import FONTS, get_font, set_font_backend
+from font_metrics import (
+    FixedMetricsFont,
+    FixedMetricsFontBackend,
+    FontBackend,
+)
+from helpers import paint_tree
+from parser import HTMLParser
+
+
+class TestFixedMetricsFont:
+    def test_monospace_advances_are_equal(self):
+        font = FixedMetricsFont(12, "normal", "roman", "Courier New")
+        assert font.measure("iiii") == font.measure("MMMM") == 38
+        assert font.metrics("linespace") == 19
+
+    def test_proportional_advances_come_from_table(self):
+        font = FixedMetricsFont(12, "normal", "roman")
+        assert font.measure("i") < font.measure("M")
+        # "hello" in Helvetica is 556 + 556 + 222 + 222 + 556 thousandths of
+        # an em, at 16 pixels to the em
+        assert font.measure("hello") == round(2112 * 16 / 1000)
+
+    def test_bold_is_wider(self):
+        regular = FixedMetricsFont(12, "normal", "roman")
+        bold = FixedMetricsFont(12, "bold", "roman")
+        assert bold.measure("word") > regular.measure("word")
+
+    def test_metrics(self):
+        font = FixedMetricsFont(12, "normal", "roman")
+        metrics = font.metrics()
+        assert metrics["linespace"] == metrics["ascent"] + metrics["descent"]
+        assert font.metrics("ascent") == metrics["ascent"]
+
+
+@pytest.mark.usefixtures("fixed_metrics")
+class TestFixedMetricsFontBackend:
+    def test_backend_must_implement_create_font(self):
+        class Incomplete(FontBackend):
+            pass
+
+        with pytest.raises(TypeError):
+            Incomplete()  # type: ignore[abstract]
+
+    def test_get_font_uses_backend(self):
+        font = get_font(12, "bold", "italic", "Courier New")
+        assert isinstance(font.font, FixedMetricsFont)
+        assert font.size == 12
+        assert str(font) == "{Courier New} 12 bold italic"
+
+    def test_switching_backend_drops_fonts(self):
+        get_font(12, "normal", "roman")
+        set_font_backend(FixedMetricsFontBackend())
+        assert FONTS == {}
+
+    def test_layout_runs_on_fixed_metrics(self):
+        tree = HTMLParser("<p>some words <b>bold</b></p><abbr>json</abbr>").parse()
+        style(tree, [])
+        document = DocumentLayout(tree)
+        document.layout()
+        display_list: list = []
+        paint_tree(document, display_list)
+        assert [cmd.text for cmd in display_list] == ["some", "words", "bold", "JSON"]
+        some, words = display_list[0], display_list[1]
+        space = some.font.measure(" ")
+        assert words.rect.left == some.rect.right + space
+        assert document.height > 0
@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+
+import pytest
+from headless import output_paths, render_pages
+
+PAGE = "data:text/html,<p>Hello <b>world</b></p>"
+
+
+# render_pages switches to fixed metrics; the fixture switches back after
+@pytest.mark.usefixtures("fixed_metrics")
+class TestHeadless:
+    def test_writes_display_list_as_json(self, tmp_path):
+        out = str(tmp_path / "page.json")
+        assert render_pages([PAGE], out) == 0
+        with open(out) as f:
+            page = json.load(f)
+        assert page["url"] == PAGE
+        texts = [cmd for cmd in page["display_list"] if cmd["type"] == "text"]
+        assert [cmd["text"] for cmd in texts] == ["Hello", "world"]
+        assert texts[1]["font"]["weight"] == "bold"
+        assert texts[0]["rect"]["right"] < texts[1]["rect"]["left"]
+
+    def test_writes_svg(self, tmp_path):
+        out = str(tmp_path / "page.svg")
+        assert render_pages(["data:text/html,<p>a &amp; b</p>"], out) == 0
+        svg = ET.parse(out).getroot()
+        texts = [el.text for el in svg if el.tag.endswith("text")]
+        assert texts == ["a", "&", "b"]
+
+    def test_numbers_outputs_for_several_pages(self, tmp_path):
+        out = str(tmp_path / "page.json")
+        assert render_pages([PAGE, "data:text/html,<p>two</p>"], out) == 0
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "page-1.json",
+            "page-2.json",
+        ]
+
+    def test_failed_page_does_not_stop_the_rest(self, tmp_path):
+        out = str(tmp_path / "page.json")
+        missing = "file://" + str(tmp_path / "missing.html")
+        assert render_pages([missing, PAGE], out) == 1
+        assert [p.name for p in tmp_path.iterdir()] == ["page-2.json"]
+
+    def test_missing_page_reports_one_line(self, tmp_path, capsys):
+        out = str(tmp_path / "page.json")
+        missing = "file://" + str(tmp_path / "missing.html")
+        assert render_pages([missing], out) == 1
+        assert capsys.readouterr().err.count("\n") == 1
+
+    def test_page_without_content_fails_with_message(self, tmp_path, capsys):
+        out = str(tmp_path / "page.json")
+        assert render_pages(["about:blank"], out) == 1
+        assert capsys.readouterr().err == "No content at about:blank\n"
+        assert list(tmp_path.iterdir()) == []
+
+    def test_cli_rejects_unknown_output_format(self, tmp_path):
+        src = os.path.join(os.path.dirname(__file__), "..", "src")
+        result = subprocess.run(
+            [sys.executable, "browser.py", "--headless", "--out", "page.txt", PAGE],
+            cwd=src,
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 2
+        assert "--out must end in one of .json, .svg" in result.stderr
+        assert "Traceback" not in result.stderr
+
+    def test_output_paths(self):
+        assert output_paths("out.svg", 1) == ["out.svg"]
+        assert output_paths("out.svg", 2) == ["out-1.svg", "out-2.svg"]
@@ -0,0 +1,65 @@
+import pytest
+from parser import HTMLParser
+
+from css_parser import style
+from document_layout import DocumentLayout
+from helpers import tree_to_list
+from hit_test import HitTestIndex
+from stylesheet_cache import STYLESHEET_CACHE
+
+PAGE = "".join(
+    f"<p>Paragraph {i} with <a href='/{i}'>a link</a> and <b>bold words</b></p>"
+    for i in range(40)
+)
+
+
+def linear_hit(document, x: float, y: float):
+    objs = [
+        obj
+        for obj in tree_to_list(document, [])
+        if obj.x
+        and obj.y
+        and obj.x <= x < obj.x + obj.width
+        and obj.y <= y < obj.y + obj.height
+    ]
+    return objs[-1] if objs else None
+
+
+class TestHitTestIndex:
+    @pytest.fixture(autouse=True)
+    def document(self, fixed_metrics):
+        self.tree = HTMLParser(PAGE).parse()
+        style(self.tree, STYLESHEET_CACHE.default_style_sheet())
+        self.document = DocumentLayout(self.tree)
+        self.document.layout()
+
+    def test_hit_matches_linear_scan(self):
+        index = HitTestIndex(self.document, tile_height=50)
+        for y in range(0, int(self.document.height) + 40, 7):
+            for x in range(0, 800, 23):
+                assert index.hit(x, y) is linear_hit(self.document, x, y)
+
+    def test_hit_returns_innermost_box(self):
+        index = HitTestIndex(self.document)
+        link = next(
+            node
+            for node in tree_to_list(self.tree, [])
+            if getattr(node, "tag", None) == "a"
+        )
+        word = index.boxes_for(link.children[0])[0]
+        hit = index.hit(word.x + 1, word.y + 1)
+        assert hit is word
+        assert hit.node.parent is link
+
+    def test_boxes_for_maps_nodes_to_layout(self):
+        index = HitTestIndex(self.document)
+        paragraphs = [
+            node
+            for node in tree_to_list(self.tree, [])
+            if getattr(node, "tag", None) == "p"
+        ]
+        # Each paragraph has its block and the one line its words fit on
+        boxes = index.boxes_for(paragraphs[3])
+        assert [type(box).__name__ for box in boxes] == ["BlockLayout", "LineLayout"]
+        assert all(box.node is paragraphs[3] for box in boxes)
+        assert index.hit(-10, -10) is None
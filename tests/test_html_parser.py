@@ -1,5 +1,5 @@
 import pytest
-from parser import HTMLParser
+from parser import HTMLParser, ViewSourceHTMLParser
 
 
 class TestHTMLParser:
@@ -51,3 +51,148 @@ class TestHTMLParser:
             str(parsed)
             == "<html><body><div id='1' class='test > abcd'>'content'</div></body></html>"
         )
+
+    @pytest.mark.parametrize(
+        "input",
+        [
+            "<html><body>test</body></html>",
+            "<div><!-- ab<>cd-->test<!--comment--></div><p>test2</p>",
+            "<script>window.load() => {}</script><p>after</p>",
+            "<div id='1' class='test > abcd'>content &lt;here&gt;</div>",
+        ],
+    )
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 64])
+    def test_feed_builds_same_tree_as_parse(self, input, chunk_size):
+        parser = HTMLParser()
+        for i in range(0, len(input), chunk_size):
+            parser.feed(input[i : i + chunk_size])
+        assert str(parser.close()) == str(HTMLParser(input).parse())
+
+    def test_view_source_feed_builds_same_tree_as_parse(self):
+        input = "<html><body>test</body></html>"
+        parser = ViewSourceHTMLParser()
+        for c in input:
+            parser.feed(c)
+        assert str(parser.close()) == str(ViewSourceHTMLParser(input).parse())
+
+    @pytest.mark.parametrize(
+        "input, expected",
+        [
+            (
+                "hello <b>x</b>",
+                "<html><body><b>'hello '</b>'<b>'<b>'x'</b>'</b>'</body></html>",
+            ),
+            ("  <p>hi</p>", "<html><body>'  <p>'<b>'hi'</b>'</p>'</body></html>"),
+        ],
+    )
+    def test_view_source_starting_with_text(self, input, expected):
+        assert str(ViewSourceHTMLParser(input).parse()) == expected
+        parser = ViewSourceHTMLParser()
+        for c in input:
+            parser.feed(c)
+        assert str(parser.close()) == expected
+
+    def test_keeps_quotes_and_angle_brackets_in_script(self):
+        parsed = HTMLParser("<script>if (a < b) { say('hi') }</script>").parse()
+        assert (
+            str(parsed)
+            == "<html><head><script>\"if (a < b) { say('hi') }\"</script></head></html>"
+        )
+
+    def test_nested_paragraph_closes_open_paragraph(self):
+        parsed = HTMLParser("<p>one<b>bold<p>two").parse()
+        assert (
+            str(parsed)
+            == "<html><body><p>'one'<b>'bold'</b></p><p><b>'two'</b></p></body></html>"
+        )
+
+    def test_parses_deeply_nested_elements(self):
+        depth = 5000
+        parser = HTMLParser("<div>" * depth + "deepest" + "</div>" * depth)
+        node = parser.parse()
+        for _ in range(depth + 2):
+            node = node.children[0]
+        assert node.text == "deepest"
+        assert not any(parser.open_tag_counts.values())
+
+    def test_nodes_share_empty_children_and_attributes(self):
+        parsed = HTMLParser("<div>one</div><div>two</div>").parse()
+        body = parsed.children[0]
+        first, second = body.children
+        assert first.children[0].children is second.children[0].children
+        assert first.attributes is second.attributes
+        assert not hasattr(first, "__dict__")
+
+    def test_set_attribute_allocates_attributes(self):
+        parsed = HTMLParser("<input>").parse()
+        input = parsed.children[0].children[0]
+        assert dict(input.attributes) == {}
+        input.set_attribute("value", "typed")
+        assert input.attributes["value"] == "typed"
+
+    def test_decodes_named_and_numeric_character_references(self):
+        parsed = HTMLParser(
+            "<p title='a&amp;b'>&lt;&eacute;&#233;&#xE9;&ndash;&amp;&bogus;</p>"
+        ).parse()
+        p = parsed.children[0].children[0]
+        assert p.attributes["title"] == "a&b"
+        assert p.children[0].text == "<ééé–&&bogus;"
+
+
+class TestLexerEdgeCases:
+    # Pins how the lexer handles script attributes, comments, quotes and
+    # unterminated markup. The old per-character lexer leaked comments that
+    # followed text into bogus tags and dropped quotes and stray ">" from text
+
+    @pytest.mark.parametrize(
+        "input, expected",
+        [
+            (
+                "<script type=text/javascript>if (a<b) { x() }</script>",
+                "<html><head><script type='text/javascript'>'if (a<b) { x() }'</script></head></html>",
+            ),
+            (
+                "<script src='a.js' async><b>no</b></script><p>t</p>",
+                "<html><head><script src='a.js' async=''>'<b>no</b>'</script></head><body><p>'t'</p></body></html>",
+            ),
+        ],
+    )
+    def test_script_with_attributes_holds_raw_text(self, input, expected):
+        assert str(HTMLParser(input).parse()) == expected
+
+    @pytest.mark.parametrize(
+        "input, expected",
+        [
+            ("<p>a<!-- c -->b</p>", "<html><body><p>'a''b'</p></body></html>"),
+            ("<p>a<!-- a -- b -->c</p>", "<html><body><p>'a''c'</p></body></html>"),
+            (
+                "<div><!-- one --><!-- two -->t</div>",
+                "<html><body><div>'t'</div></body></html>",
+            ),
+            ("<!-- x -->text", "<html><body>'text'</body></html>"),
+            ("<p>a<!-- x", "<html><body><p>'a'</p></body></html>"),
+        ],
+    )
+    def test_comments_between_text(self, input, expected):
+        assert str(HTMLParser(input).parse()) == expected
+
+    def test_quotes_and_stray_angle_bracket_are_text(self):
+        parsed = HTMLParser("""it's "a > b\"""").parse()
+        assert parsed.children[0].children[0].text == """it's "a > b\""""
+
+    def test_unterminated_tag_is_dropped(self):
+        parsed = HTMLParser("<p>t</p><div class=x").parse()
+        assert str(parsed) == "<html><body><p>'t'</p></body></html>"
+
+    @pytest.mark.parametrize(
+        "input",
+        [
+            "<p>a<!-- a -- b -->c</p><script type=x>a<b</script>",
+            "<div><!-- one --><!-- two -->it's</div>",
+        ],
+    )
+    def test_streaming_matches_whole_document(self, input):
+        parser = HTMLParser()
+        for c in input:
+            parser.feed(c)
+        assert str(parser.close()) == str(HTMLParser(input).parse())
@@ -0,0 +1,91 @@
+import os
+
+from http_cache import HTTP_CACHE, HTTPCache
+from test_utils import socket
+from typedclasses import HTTPResponse
+from url import URL
+
+
+def http_response(body: bytes, *headers: bytes) -> bytes:
+    response = b"HTTP/1.1 200 OK\r\n"
+    for header in headers:
+        response += header + b"\r\n"
+    response += b"Content-Length: " + str(len(body)).encode("ascii") + b"\r\n"
+    return response + b"\r\n" + body
+
+
+class TestHTTPCache:
+    def setup_method(self):
+        socket.patch().start()
+        socket.clear_history()
+        HTTP_CACHE.clear()
+
+    def test_fresh_response_is_served_without_request(self):
+        url = "http://cache.test/fresh"
+        socket.respond(url, http_response(b"cached", b"Cache-Control: max-age=60"))
+        assert URL(url).request() == "cached"
+        assert URL(url).request() == "cached"
+        assert len(socket.Requests[url]) == 1
+        assert HTTP_CACHE.stats()["hits"] == 1
+
+    def test_no_store_response_is_not_cached(self):
+        url = "http://cache.test/no-store"
+        socket.respond(url, http_response(b"body", b"Cache-Control: no-store"))
+        URL(url).request()
+        URL(url).request()
+        assert len(socket.Requests[url]) == 2
+        assert HTTP_CACHE.stats()["entries"] == 0
+
+    def test_stale_response_is_revalidated_with_etag(self):
+        url = "http://cache.test/etag"
+        socket.respond(
+            url, http_response(b"original", b"Cache-Control: no-cache", b'ETag: "v1"')
+        )
+        assert URL(url).request() == "original"
+        socket.respond(url, b'HTTP/1.1 304 Not Modified\r\nETag: "v1"\r\n\r\n')
+        assert URL(url).request() == "original"
+        assert b'If-None-Match: "v1"' in socket.last_request(url)
+        assert HTTP_CACHE.stats()["revalidations"] == 1
+
+    def test_evicts_least_recently_used_entries(self):
+        cache = HTTPCache(max_bytes=40)
+        response = HTTPResponse(200, {"etag": "x"}, "a" * 15)
+        cache.store("http://a/", response)
+        cache.store("http://b/", response)
+        cache.get("http://a/")
+        cache.store("http://c/", response)
+        assert cache.get("http://a/") is not None
+        assert cache.get("http://b/") is None
+        assert cache.stats()["evictions"] == 1
+
+    def test_entries_persist_on_disk(self, tmp_path):
+        response = HTTPResponse(200, {"cache-control": "max-age=60"}, "on disk")
+        HTTPCache(directory=str(tmp_path)).store("http://disk/", response)
+        entry, fresh = HTTPCache(directory=str(tmp_path)).lookup("http://disk/")
+        assert entry is not None and fresh
+        assert entry.body == "on disk"
+
+    def test_disk_eviction_is_counted_separately(self, tmp_path):
+        cache = HTTPCache(max_bytes=500, directory=str(tmp_path))
+        for i in range(4):
+            body = str(i) * 100
+            cache.store(f"http://{i}/", HTTPResponse(200, {"etag": "x"}, body))
+        assert cache.stats()["evictions"] == 0
+        assert cache.stats()["disk_evictions"] > 0
+        assert cache.disk_size == sum(p.stat().st_size for p in tmp_path.iterdir())
+        assert cache.disk_size <= 500
+
+    def test_directory_is_only_listed_when_over_the_cap(self, tmp_path, monkeypatch):
+        cache = HTTPCache(directory=str(tmp_path))
+        response = HTTPResponse(200, {"etag": "x"}, "small")
+        cache.store("http://first/", response)
+        listings = []
+        listdir = os.listdir
+        monkeypatch.setattr(
+            os, "listdir", lambda path: listings.append(path) or listdir(path)
+        )
+        for i in range(20):
+            cache.store(f"http://{i}/", response)
+        cache.store("http://first/", response)
+        assert listings == []
+        assert cache.disk_size == sum(p.stat().st_size for p in tmp_path.iterdir())
@@ -2,8 +2,9 @@ import pytest
 from constants import HSTEP
 from document_layout import DocumentLayout
 from parser import HTMLParser
-from helpers import paint_tree
-from css_parser import style
+from helpers import paint_tree, tree_to_list
+from css_parser import RuleIndex, restyle, style
+from line_layout import TextLayout
 
 
 class TestLayout:
@@ -61,3 +62,52 @@ class TestLayout:
         assert display_list[0].text == "super­cali­fragi­listic­expi­ali­docious-"
         assert display_list[1].text == "aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa-"
         assert display_list[2].text == "bbbbbbbbbbbbbbbbbbbbbbbbbbbbbb"
+
+
+class TestIncrementalLayout:
+    def setup_method(self):
+        self.tree = HTMLParser("<p>first para</p><p>second para</p>").parse()
+        self.rules = RuleIndex([])
+        restyle(self.tree, self.rules)
+        self.document = DocumentLayout(self.tree)
+        self.document.layout()
+
+    def relayout(self) -> None:
+        restyle(self.tree, self.rules)
+        self.document.layout()
+
+    def words(self) -> list:
+        return [
+            obj
+            for obj in tree_to_list(self.document, [])
+            if isinstance(obj, TextLayout)
+        ]
+
+    def test_relayout_keeps_width_and_layout_objects(self):
+        width = self.document.width
+        words = self.words()
+        self.relayout()
+        assert self.document.width == width
+        assert all(new is old for new, old in zip(self.words(), words))
+
+    def test_style_change_shifts_following_blocks(self):
+        first, second = self.tree.children[0].children
+        before = self.words()
+        y_before = [word.y for word in before]
+        first.set_attribute("style", "font-size: 32px")
+        self.relayout()
+        after = self.words()
+        # The first paragraph is laid out again with the bigger font
+        assert after[0] is not before[0]
+        assert after[0].font.size == 24
+        # The second is the same layout objects, moved down
+        assert after[2] is before[2] and after[3] is before[3]
+        assert after[2].y > y_before[2]
+        assert after[2].x == before[2].x
+
+    def test_width_change_lays_out_again(self):
+        words = self.words()
+        self.document.page_width = 400
+        self.document.layout()
+        assert self.document.width == 400 - 2 * HSTEP
+        assert all(new is not old for new, old in zip(self.words(), words))
@@ -0,0 +1,158 @@
+import io
+import queue
+import threading
+from unittest import mock
+
+from network_loader import LoadHandle, NetworkLoader
+from tab import Tab
+from test_utils import socket
+from url import URL
+
+
+class FakeWindow:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append(callback)
+
+    def run_until_idle(self):
+        while self.scheduled:
+            self.scheduled.pop(0)()
+
+
+class StalledResponse:
+    # Sends the headers and the first part of the body, then blocks the
+    # reader until the socket is shut down, like a server that went quiet
+    def __init__(self, sock, head: bytes):
+        self.sock = sock
+        self.head = io.BytesIO(head)
+
+    def readline(self):
+        return self.head.readline()
+
+    def read1(self, size):
+        block = self.head.read(size)
+        if block:
+            return block
+        StalledSocket.reading_socket.put(self.sock)
+        self.sock.aborted.wait(5)
+        return b""
+
+    def close(self):
+        pass
+
+
+class StalledSocket:
+    reading_socket: queue.Queue = queue.Queue()
+
+    def __init__(self, *args, **kwargs):
+        self.aborted = threading.Event()
+        self.closed = False
+
+    @classmethod
+    def wait_for_read(cls) -> "StalledSocket":
+        return cls.reading_socket.get(timeout=5)
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def connect(self, host_port):
+        pass
+
+    def send(self, text):
+        pass
+
+    def makefile(self, mode):
+        head = b"HTTP/1.1 200 OK\r\nContent-Length: 1000\r\n\r\n<p>Partial"
+        return StalledResponse(self, head)
+
+    def shutdown(self, how):
+        self.aborted.set()
+
+    def close(self):
+        self.closed = True
+
+
+class TestNetworkLoader:
+    def test_delivers_result_on_poll(self):
+        window = FakeWindow()
+        loader = NetworkLoader(window, poll_interval=0)
+        results = []
+        loader.submit(lambda handle: "done", results.append, results.append)
+        window.run_until_idle()
+        assert results == ["done"]
+
+    def test_cancelled_load_is_dropped(self):
+        window = FakeWindow()
+        loader = NetworkLoader(window, poll_interval=0)
+        release = threading.Event()
+        results = []
+
+        def job(handle):
+            release.wait()
+            return "stale"
+
+        handle = loader.submit(job, results.append, results.append)
+        handle.cancel()
+        release.set()
+        window.run_until_idle()
+        assert handle.cancelled
+        assert results == []
+
+    def test_errors_are_delivered_to_error_callback(self):
+        window = FakeWindow()
+        loader = NetworkLoader(window, poll_interval=0)
+        errors = []
+
+        def job(handle):
+            raise OSError("refused")
+
+        loader.submit(job, lambda result: None, errors.append)
+        window.run_until_idle()
+        assert isinstance(errors[0], OSError)
+
+    def test_tab_loads_in_background(self):
+        socket.patch().start()
+        url = socket.serve("<p>Loaded</p>")
+        window = FakeWindow()
+        loaded = []
+        tab = Tab(
+            600, loader=NetworkLoader(window, poll_interval=0), on_load=loaded.append
+        )
+        tab.load(URL(url))
+        assert tab.loading
+        window.run_until_idle()
+        assert not tab.loading
+        assert loaded == [tab]
+        assert [cmd.text for cmd in tab.display_list] == ["Loaded"]
+
+    def test_cancel_aborts_stalled_body(self):
+        handle = LoadHandle()
+        results = []
+        with mock.patch("socket.socket", StalledSocket):
+            worker = threading.Thread(
+                target=lambda: results.append(
+                    Tab(600).fetch(URL("http://stalled.test/"), handle)
+                )
+            )
+            worker.start()
+            sock = StalledSocket.wait_for_read()
+            handle.cancel()
+            worker.join(1)
+        assert not worker.is_alive()
+        assert sock.aborted.is_set() and sock.closed
+        assert results == [None]
+        assert handle.sockets == set()
+
+    def test_page_fetch_has_a_deadline(self):
+        handle = LoadHandle(timeout=7)
+        with mock.patch("socket.socket", StalledSocket):
+            worker = threading.Thread(
+                target=Tab(600).fetch, args=(URL("http://slow.test/"), handle)
+            )
+            worker.start()
+            sock = StalledSocket.wait_for_read()
+            handle.cancel()
+            worker.join(1)
+        assert 0 < sock.timeout <= 7
@@ -0,0 +1,56 @@
+from stylesheet_cache import STYLESHEET_CACHE, StyleSheetCache
+from tab import Tab
+from test_utils import socket
+from url import URL
+
+
+class TestStyleSheetCache:
+    def test_unchanged_sheet_is_parsed_once(self):
+        cache = StyleSheetCache()
+        first = cache.parse("http://css.test/a.css", "p { color: red; }")
+        second = cache.parse("http://css.test/a.css", "p { color: red; }")
+        assert first is second
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_changed_sheet_is_parsed_again(self):
+        cache = StyleSheetCache()
+        cache.parse("http://css.test/a.css", "p { color: red; }")
+        rules = cache.parse("http://css.test/a.css", "p { color: blue; }")
+        assert rules[0][1]["color"] == "blue"
+        assert cache.stats()["misses"] == 2
+
+    def test_least_recently_used_sheet_is_evicted(self):
+        sheet = "p { color: red; }"
+        cache = StyleSheetCache(max_bytes=2 * len(sheet))
+        cache.parse("a.css", sheet)
+        cache.parse("b.css", sheet)
+        cache.parse("a.css", sheet)
+        cache.parse("c.css", sheet)
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["entries"] == 2
+        cache.parse("a.css", sheet)
+        assert cache.stats()["hits"] == 2
+
+    def test_default_sheet_is_parsed_once(self):
+        cache = StyleSheetCache()
+        assert cache.default_style_sheet() is cache.default_style_sheet()
+
+    def test_navigation_reuses_parsed_sheets(self):
+        socket.patch().start()
+        STYLESHEET_CACHE.clear()
+        url = "http://css.test/page"
+        socket.respond(
+            url,
+            b"HTTP/1.1 200 OK\r\n\r\n"
+            b"<link rel='stylesheet' href='/style.css'><p>text</p>",
+        )
+        socket.respond(
+            "http://css.test/style.css",
+            b"HTTP/1.1 200 OK\r\n\r\np { color: red; }",
+        )
+        tab = Tab(100)
+        tab.load(URL(url))
+        tab.load(URL(url))
+        assert STYLESHEET_CACHE.stats()["misses"] == 1
+        assert STYLESHEET_CACHE.stats()["hits"] == 1
@@ -0,0 +1,44 @@
+import time
+
+from network_loader import LoadHandle
+from subresources import fetch_subresources
+
+
+class FakeURL:
+    def __init__(self, body, delay=0.0, error=None):
+        self.body = body
+        self.delay = delay
+        self.error = error
+
+    def request(self, timeout=None, handle=None):
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.body
+
+
+class TestFetchSubresources:
+    def test_results_are_in_request_order(self):
+        urls = [FakeURL("first", delay=0.05), FakeURL("second"), FakeURL("third")]
+        assert fetch_subresources(urls) == ["first", "second", "third"]
+
+    def test_failed_fetch_returns_none(self):
+        urls = [FakeURL("ok"), FakeURL(None, error=OSError("refused"))]
+        assert fetch_subresources(urls) == ["ok", None]
+
+    def test_slow_fetch_does_not_stall_load(self):
+        urls = [FakeURL("slow", delay=0.5), FakeURL("fast")]
+        start = time.monotonic()
+        assert fetch_subresources(urls, timeout=0.1) == [None, "fast"]
+        assert time.monotonic() - start < 0.4
+
+    def test_cancelled_load_fetches_nothing(self):
+        handle = LoadHandle()
+        handle.cancel()
+        urls = [FakeURL("never", error=AssertionError("fetched"))]
+        assert fetch_subresources(urls, handle=handle) == [None]
+
+    def test_fetches_share_the_page_deadline(self):
+        urls = [FakeURL("slow", delay=0.5), FakeURL("fast")]
+        handle = LoadHandle(timeout=0.1)
+        assert fetch_subresources(urls, handle=handle) == [None, "fast"]
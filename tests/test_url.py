@@ -1,3 +1,6 @@
+import gzip
+
+from connection_pool import CONNECTION_POOL
 from url import URL
 from test_utils import socket, ssl
 from unittest.mock import mock_open, patch
@@ -68,3 +71,80 @@ class TestURL:
         )
         body = URL(url).request()
         assert body == "Body text"
+
+    def test_request_http_reuses_keep_alive_connection(self):
+        socket.patch().start()
+        CONNECTION_POOL.clear()
+        body = b"Body text"
+        response = (
+            b"HTTP/1.1 200 OK\r\n"
+            + b"Content-Length: "
+            + str(len(body)).encode("ascii")
+            + b"\r\n\r\n"
+            + body
+        )
+        socket.respond("http://pool.test/page", response)
+        socket.respond("http://pool.test/style.css", response)
+        assert URL("http://pool.test/page").request() == "Body text"
+        assert URL("http://pool.test/style.css").request() == "Body text"
+        assert CONNECTION_POOL.stats() == {"hits": 1, "misses": 1, "idle": 1}
+
+    def test_request_http_closes_connection_without_keep_alive(self):
+        socket.patch().start()
+        CONNECTION_POOL.clear()
+        url = "http://close.test/page"
+        socket.respond(
+            url, b"HTTP/1.0 200 OK\r\n" + b"Content-Length: 4\r\n\r\n" + b"Body"
+        )
+        assert URL(url).request() == "Body"
+        assert URL(url).request() == "Body"
+        assert CONNECTION_POOL.stats() == {"hits": 0, "misses": 2, "idle": 0}
+
+    def test_request_http_decodes_chunked_body(self):
+        socket.patch().start()
+        url = "http://chunked.test/page"
+        socket.respond(
+            url,
+            b"HTTP/1.1 200 OK\r\n"
+            + b"Transfer-Encoding: chunked\r\n\r\n"
+            + b"4\r\nBody\r\n5;ext=1\r\n text\r\n0\r\n\r\n",
+        )
+        assert URL(url).request() == "Body text"
+        assert b"Accept-Encoding: gzip, deflate" in socket.last_request(url)
+
+    def test_request_http_decompresses_gzip_body(self):
+        socket.patch().start()
+        url = "http://gzip.test/page"
+        body = gzip.compress(b"Body text")
+        socket.respond(
+            url,
+            b"HTTP/1.1 200 OK\r\n"
+            + b"Content-Encoding: gzip\r\n"
+            + b"Content-Length: "
+            + str(len(body)).encode("ascii")
+            + b"\r\n\r\n"
+            + body,
+        )
+        assert URL(url).request() == "Body text"
+
+    def test_request_http_decodes_declared_charset(self):
+        socket.patch().start()
+        url = "http://charset.test/page"
+        socket.respond(
+            url,
+            b"HTTP/1.0 200 OK\r\n"
+            + b"Content-Type: text/html; charset=ISO-8859-1\r\n\r\n"
+            + "café".encode("latin1"),
+        )
+        assert URL(url).request() == "café"
+
+    def test_stream_yields_body_in_pieces(self):
+        socket.patch().start()
+        url = "http://stream.test/page"
+        socket.respond(
+            url,
+            b"HTTP/1.1 200 OK\r\n"
+            + b"Transfer-Encoding: chunked\r\n\r\n"
+            + b"4\r\nBody\r\n5\r\n text\r\n0\r\n\r\n",
+        )
+        assert list(URL(url).stream()) == ["Body", " text"]